@@ -0,0 +1,84 @@
+"""Cold import time of each public entry point.
+
+Every measurement runs in a fresh interpreter and times
+`import scrapetools` plus the first access of the entry point,
+which is when its submodule and dependencies get imported.
+Results can be saved to json and compared like `run.py`'s.
+
+Usage:
+    python benchmarks/bench_import.py --output imports.json
+    python benchmarks/bench_import.py --compare imports.json --repeat 10"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import Any
+
+import report
+
+import scrapetools
+
+SCRIPT = """
+import time
+start = time.perf_counter()
+import scrapetools
+scrapetools.{name}
+print(time.perf_counter() - start)
+"""
+
+
+def time_import(name: str, repeat: int) -> list[float]:
+    """Returns the cold import times in seconds of `scrapetools.{name}`."""
+    times: list[float] = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", SCRIPT.format(name=name)],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        times.append(float(output))
+    return times
+
+
+def run(repeat: int = 5) -> dict[str, Any]:
+    """Returns the minimum and median cold import time in milliseconds
+    for `import scrapetools` and each name in `scrapetools.__all__`,
+    see `report.make_report()`."""
+    results: dict[str, dict[str, float]] = {}
+    for name in ["__version__"] + scrapetools.__all__:
+        times = time_import(name, repeat)
+        results[name] = {
+            "min_ms": min(times) * 1000,
+            "median_ms": statistics.median(times) * 1000,
+        }
+        print_result(name, results[name])
+    return report.make_report(results, repeat=repeat)
+
+
+HEADER = f"{'entry point':<25}{'min ms':>10}{'median ms':>12}"
+
+
+def print_result(name: str, result: dict[str, float], baseline: float | None = None):
+    name = "import scrapetools" if name == "__version__" else name
+    line = f"{name:<25}{result['min_ms']:>10.1f}{result['median_ms']:>12.1f}"
+    if baseline:
+        line += f"{result['min_ms'] / baseline:>10.2f}x"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--repeat", type=int, default=5, help="Fresh interpreters per entry point."
+    )
+    report.add_arguments(parser)
+    args = parser.parse_args()
+    print(HEADER)
+    current = run(args.repeat)
+    report.save_and_compare(args, current, HEADER, print_result, "min_ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Microbenchmark for per-call pattern setup.
+
+Runs the small, frequently called functions with the `re` module's cache
+purged before every call, the way it behaves when other libraries in the
+process thrash it, and compares against compiling the patterns each call
+like these functions used to.
+
+Usage: python benchmarks/bench_patterns.py [number]"""
+
+import re
+import sys
+import timeit
+
+from scrapetools import email_scraper, patterns, phone_scraper
+
+EMAILS = ["john@example.com", "jane.doe@company.co", "logo@2x.png", "sales@shop.store"]
+TEXT = "Contact john@example.com or (212) 555-0123 u003ejane.doe@company.co"
+
+
+def compile_per_call():
+    """Roughly what `scrape_emails` and `scrape_phone_numbers` used to build every call."""
+    for pattern in [
+        patterns.EMAIL_REGEX,
+        patterns.PHONE_REGEX,
+        patterns.UNICODE_HEX_REGEX,
+        patterns.NON_DIGIT_REGEX,
+    ]:
+        re.compile(pattern)
+    ignore = "$|".join(patterns.FILE_EXTENSIONS) + "$"
+    re.compile(r".*[.](?!" + ignore + r")[^.]*$")
+
+
+def main(number: int = 2000):
+    benchmarks = {
+        "pattern compilation per call (old setup cost)": compile_per_call,
+        "filter_out_files": lambda: email_scraper.filter_out_files(EMAILS),
+        "scrape_emails": lambda: email_scraper.scrape_emails(TEXT),
+        "scrape_phone_numbers": lambda: phone_scraper.scrape_phone_numbers(TEXT),
+    }
+    print(f"{'benchmark':<50}{'us/call':>10}")
+    for name, func in benchmarks.items():
+
+        def run():
+            re.purge()
+            func()
+
+        seconds = timeit.timeit(run, number=number)
+        print(f"{name:<50}{seconds / number * 1e6:>10.2f}")
+
+
+if __name__ == "__main__":
+    main(*[int(arg) for arg in sys.argv[1:2]])
@@ -0,0 +1,142 @@
+"""Reproducible synthetic html corpus for the benchmarks.
+
+Every page is generated from a seed, so the same seed always
+produces exactly the same corpus."""
+
+import random
+
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua contact us about services pricing"
+).split()
+TLDS = ["com", "org", "net", "io", "co.uk", "store"]
+
+
+def make_email(rng: random.Random) -> str:
+    local = f"{rng.choice(WORDS)}.{rng.choice(WORDS)}{rng.randint(1, 99)}"
+    return f"{local}@{rng.choice(WORDS)}.{rng.choice(TLDS)}"
+
+
+def make_phone_number(rng: random.Random) -> str:
+    area, exchange, line = (
+        rng.randint(201, 989),
+        rng.randint(200, 999),
+        rng.randint(0, 9999),
+    )
+    return rng.choice(
+        [
+            f"({area}) {exchange}-{line:04d}",
+            f"{area}-{exchange}-{line:04d}",
+            f"{area}.{exchange}.{line:04d}",
+        ]
+    )
+
+
+def make_link(rng: random.Random) -> str:
+    path = "/".join(rng.choice(WORDS) for _ in range(rng.randint(1, 4)))
+    if rng.random() < 0.3:
+        return f"https://www.{rng.choice(WORDS)}.{rng.choice(TLDS)}/{path}"
+    return f"/{path}"
+
+
+def make_block(rng: random.Random) -> str:
+    """Returns a chunk of html with text, links, images, and the occasional
+    email, phone number, or form."""
+    text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+    parts = [f"<div class='section'><p>{text}</p>"]
+    for _ in range(rng.randint(2, 6)):
+        parts.append(f'<a href="{make_link(rng)}">{rng.choice(WORDS)}</a>')
+    if rng.random() < 0.5:
+        parts.append(f'<img src="/img/{rng.choice(WORDS)}.png" alt="">')
+    if rng.random() < 0.2:
+        parts.append(f"<p>Email {make_email(rng)}</p>")
+    if rng.random() < 0.2:
+        parts.append(f"<p>Call {make_phone_number(rng)}</p>")
+    if rng.random() < 0.05:
+        parts.append(
+            '<form action="/search"><input name="q" type="text">'
+            "<button>Search</button></form>"
+        )
+    parts.append("</div>")
+    return "".join(parts)
+
+
+def make_page(rng: random.Random, size: int, filler: str = "") -> str:
+    """Returns a page of about `size` characters.
+
+    :param filler: Extra content inserted every few blocks."""
+    parts = [
+        "<html><head><title>Benchmark</title>",
+        '<link rel="stylesheet" href="/static/style.css">',
+        '<script src="/static/app.js"></script></head><body>',
+    ]
+    length = sum(len(part) for part in parts)
+    i = 0
+    while length < size:
+        block = make_block(rng)
+        if filler and i % 4 == 0:
+            block += filler
+        parts.append(block)
+        length += len(block)
+        i += 1
+    parts.append("</body></html>")
+    return "".join(parts)
+
+
+def make_script(rng: random.Random, size: int) -> str:
+    """Returns an inline script of about `size` characters
+    that looks like minified javascript."""
+    statements: list[str] = []
+    length = 0
+    while length < size:
+        statement = (
+            f"var {rng.choice(WORDS)}{rng.randint(0, 999)}="
+            f'"{rng.choice(WORDS)}-{rng.randint(0, 99999)}";'
+            f"function f{rng.randint(0, 999)}(a,b){{return a-b*{rng.randint(0, 9)}}}"
+        )
+        statements.append(statement)
+        length += len(statement)
+    return "<script>" + "".join(statements) + "</script>"
+
+
+CASES = ("small", "large", "many_at", "many_dash", "huge_script", "international")
+
+
+def make_case(case: str, seed: int = 0) -> str:
+    """Returns the page for a corpus case:
+
+    'small': a typical ~20 KB page.
+    'large': a ~2 MB page.
+    'many_at': a page full of '@' characters that aren't emails.
+    'many_dash': a page full of '-' and '.' separated digit runs that aren't phone numbers.
+    'huge_script': a small page with a ~1 MB inline script.
+    'international': a ~200 KB page with u.k., german, french, and indian phone numbers."""
+    # Each case gets its own generator so it doesn't depend on which other cases are built
+    rng = random.Random(f"{seed}-{case}")
+    match case:
+        case "small":
+            return make_page(rng, 20_000)
+        case "large":
+            return make_page(rng, 2_000_000)
+        case "many_at":
+            filler = "<span>@user @ @@ a@b @handle x@y@z</span>" * 10
+            return make_page(rng, 200_000, filler)
+        case "many_dash":
+            filler = "<span>12-345-67 1.23.456 2024-01-02 9-9-9-9</span>" * 10
+            return make_page(rng, 200_000, filler)
+        case "huge_script":
+            return make_page(rng, 20_000) + make_script(rng, 1_000_000)
+        case "international":
+            filler = (
+                "<p>London 020 7946 0958, +44 (0)161 496 0000</p>"
+                "<p>Berlin 030 12345678, +49 89 1234567</p>"
+                "<p>Paris 01 42 68 53 00, +33 4 91 23 45 67</p>"
+                "<p>Mumbai 022 2345 6789, +91 80 2345 6789</p>"
+            )
+            return make_page(rng, 200_000, filler)
+    raise ValueError(f"Unknown case {case!r}, must be one of {CASES}.")
+
+
+def build_corpus(seed: int = 0, cases: tuple[str, ...] = CASES) -> dict[str, str]:
+    """Returns the page for each case in `cases` by case name."""
+    return {case: make_case(case, seed) for case in cases}
@@ -0,0 +1,68 @@
+"""Saving benchmark results to json and comparing runs, shared by the benchmark scripts.
+
+A script's results are a dict of benchmark name -> measurements,
+saved along with the environment they were measured in."""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable
+
+import scrapetools
+
+# Prints a row for a result, with its ratio to the baseline's time if given.
+PrintResult = Callable[[str, dict[str, float], float | None], None]
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add the --output and --compare options."""
+    parser.add_argument("--output", type=Path, help="Save the results to this file.")
+    parser.add_argument("--compare", type=Path, help="Compare against saved results.")
+
+
+def make_report(
+    results: dict[str, dict[str, float]], **settings: Any
+) -> dict[str, Any]:
+    """Returns `results` with the versions, platform, and time they were measured on
+    and the `settings` they were run with."""
+    return {
+        "scrapetools_version": scrapetools.__version__,
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        **settings,
+        "results": results,
+    }
+
+
+def compare(
+    current: dict[str, Any],
+    baseline: dict[str, Any],
+    header: str,
+    print_result: PrintResult,
+    key: str,
+):
+    """Print each result as a ratio of its `key` time in `baseline`.
+    Ratios above 1 are slower than the baseline."""
+    print(f"\n{header}{'vs base':>11}")
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        print_result(name, result, base[key] if base else None)
+
+
+def save_and_compare(
+    args: argparse.Namespace,
+    current: dict[str, Any],
+    header: str,
+    print_result: PrintResult,
+    key: str,
+):
+    """Save `current` to `args.output` and compare it to `args.compare`, if given."""
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2))
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())
+        compare(current, baseline, header, print_result, key)
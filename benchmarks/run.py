@@ -0,0 +1,135 @@
+"""Benchmark suite for the scrapers.
+
+Times every scraper against every page of the synthetic corpus in `corpus.py`
+and optionally saves the results to json so runs can be compared.
+
+Caches (phone number validation and link normalization) are cleared
+before every timed call so each call does the full work.
+
+Usage:
+    python benchmarks/run.py --output results.json
+    python benchmarks/run.py --compare results.json
+    python benchmarks/run.py --filter emails --case small large"""
+
+import argparse
+import timeit
+from typing import Any, Callable
+
+import corpus
+import phonenumbers
+import report
+
+import scrapetools
+from scrapetools import email_scraper, link_scraper, phone_scraper
+
+
+def clear_caches():
+    phone_scraper.validation_cache.clear()
+    phone_scraper.region_cache.clear()
+    link_scraper.normalize_link.cache_clear()
+
+
+def scrape_links(source: str, backend: str = "html.parser"):
+    scraper = scrapetools.LinkScraper(
+        source, "https://www.example.com/", backend=backend
+    )
+    scraper.scrape_page()
+
+
+REGIONS = ["US", "GB", "DE", "FR", "IN"]
+
+BENCHMARKS: dict[str, Callable[[str], Any]] = {
+    "emails": email_scraper.scrape_emails,
+    "emails_noregex": email_scraper.scrape_emails_noregex,
+    # The bytes benchmarks include encoding the page
+    "emails_bytes": lambda source: email_scraper.scrape_emails(source.encode()),
+    "phones": phone_scraper.scrape_phone_numbers,
+    "phones_bytes": lambda source: phone_scraper.scrape_phone_numbers(source.encode()),
+    "phones_noregex": phone_scraper.scrape_phone_numbers_noregex,
+    # Same numbers as "phones", in E.164 format
+    "phones_regions_us": lambda source: phone_scraper.scrape_phone_numbers(
+        source, regions=["US"]
+    ),
+    "phones_regions": lambda source: phone_scraper.scrape_phone_numbers(
+        source, regions=REGIONS
+    ),
+    # What the regions option replaces for international pages
+    "phones_matcher": lambda source: [
+        match.number
+        for region in REGIONS
+        for match in phonenumbers.PhoneNumberMatcher(source, region)
+    ],
+    "links": scrape_links,
+    "links_stream": lambda source: scrape_links(source, "stream"),
+    "inputs": scrapetools.scrape_inputs,
+    "scrape_page": lambda source: scrapetools.scrape_page(
+        source, "https://www.example.com/"
+    ),
+}
+
+
+def time_call(func: Callable[[str], Any], source: str, repeat: int) -> list[float]:
+    """Returns the time in seconds of `repeat` calls of `func(source)`."""
+    times: list[float] = []
+    for _ in range(repeat):
+        clear_caches()
+        times.append(timeit.timeit(lambda: func(source), number=1))
+    return times
+
+
+def run(
+    benchmarks: list[str], cases: list[str], repeat: int, seed: int
+) -> dict[str, Any]:
+    """Run the benchmarks and return the results with some environment info."""
+    pages = corpus.build_corpus(seed, tuple(cases))
+    results: dict[str, dict[str, float]] = {}
+    for name in benchmarks:
+        for case in cases:
+            times = time_call(BENCHMARKS[name], pages[case], repeat)
+            best = min(times)
+            results[f"{name}/{case}"] = {
+                "min_s": best,
+                "mean_s": sum(times) / len(times),
+                "mb_per_s": len(pages[case]) / best / 1e6,
+            }
+            print_result(f"{name}/{case}", results[f"{name}/{case}"])
+    return report.make_report(results, seed=seed, repeat=repeat)
+
+
+HEADER = f"{'benchmark':<32}{'min ms':>12}{'MB/s':>10}"
+
+
+def print_result(name: str, result: dict[str, float], baseline: float | None = None):
+    line = f"{name:<32}{result['min_s'] * 1000:>12.2f}{result['mb_per_s']:>10.2f}"
+    if baseline:
+        line += f"{result['min_s'] / baseline:>10.2f}x"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--filter",
+        nargs="*",
+        default=list(BENCHMARKS),
+        choices=list(BENCHMARKS),
+        help="Benchmarks to run. Defaults to all of them.",
+    )
+    parser.add_argument(
+        "--case",
+        nargs="*",
+        default=list(corpus.CASES),
+        choices=corpus.CASES,
+        help="Corpus cases to run. Defaults to all of them.",
+    )
+    parser.add_argument("--repeat", type=int, default=5, help="Timed calls per case.")
+    parser.add_argument("--seed", type=int, default=0, help="Corpus seed.")
+    report.add_arguments(parser)
+    args = parser.parse_args()
+    print(HEADER)
+    current = run(args.filter, args.case, args.repeat, args.seed)
+    report.save_and_compare(args, current, HEADER, print_result, "min_s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,85 @@
-from .email_scraper import scrape_emails
-from .input_scraper import scrape_inputs
-from .link_scraper import LinkScraper
-from .phone_scraper import scrape_phone_numbers
+import importlib
+from typing import TYPE_CHECKING, Any
+
+# Submodules are only imported when one of their attributes is first accessed
+# so that e.g. `scrapetools.scrape_emails` doesn't import bs4 or phonenumbers.
+if TYPE_CHECKING:
+    from .batch import scrape_many
+    from .crawler import SiteCrawler
+    from .email_scraper import iter_emails, scrape_emails
+    from .input_scraper import InputRecord, scrape_inputs
+    from .link_scraper import LinkScraper
+    from .link_store import LinkStore
+    from .page_extractor import PageExtractor, ScrapedPage, scrape_page
+    from .phone_scraper import iter_phone_numbers, scrape_phone_numbers
+    from .result_cache import ResultCache
 
 __version__ = "1.1.9"
-__all__ = ["scrape_emails", "scrape_inputs", "LinkScraper", "scrape_phone_numbers"]
+__all__ = [
+    "scrape_emails",
+    "scrape_inputs",
+    "LinkScraper",
+    "scrape_phone_numbers",
+    "PageExtractor",
+    "ScrapedPage",
+    "scrape_page",
+    "iter_emails",
+    "iter_phone_numbers",
+    "scrape_many",
+    "SiteCrawler",
+    "LinkStore",
+    "ResultCache",
+    "InputRecord",
+]
+
+# attribute name -> submodule it's imported from
+lazy_attributes = {
+    "scrape_emails": "email_scraper",
+    "iter_emails": "email_scraper",
+    "scrape_inputs": "input_scraper",
+    "LinkScraper": "link_scraper",
+    "scrape_phone_numbers": "phone_scraper",
+    "iter_phone_numbers": "phone_scraper",
+    "PageExtractor": "page_extractor",
+    "ScrapedPage": "page_extractor",
+    "scrape_page": "page_extractor",
+    "scrape_many": "batch",
+    "SiteCrawler": "crawler",
+    "LinkStore": "link_store",
+    "ResultCache": "result_cache",
+    "InputRecord": "input_scraper",
+}
+submodules = {
+    "backends",
+    "batch",
+    "cache",
+    "cli",
+    "crawler",
+    "email_scraper",
+    "input_scraper",
+    "instrumentation",
+    "link_scraper",
+    "link_store",
+    "page_extractor",
+    "patterns",
+    "phone_scraper",
+    "prefilter",
+    "result_cache",
+    "streams",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name in lazy_attributes:
+        module = importlib.import_module(f".{lazy_attributes[name]}", __name__)
+        value = getattr(module, name)
+    elif name in submodules:
+        value = importlib.import_module(f".{name}", __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(__all__) | submodules)
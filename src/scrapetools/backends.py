@@ -0,0 +1,86 @@
+from html.parser import HTMLParser
+from typing import Iterator
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+# Backends that build a BeautifulSoup tree.
+TREE_BACKENDS = ("html.parser", "lxml")
+# Backends that only stream tag names and attributes.
+STREAM_BACKENDS = ("stream",)
+BACKENDS = TREE_BACKENDS + STREAM_BACKENDS
+
+# Number of characters fed to the streaming tokenizer at a time.
+STREAM_CHUNK_SIZE = 65536
+
+
+class AttributeTokenizer(HTMLParser):
+    """Collects the name and attributes of every start tag
+    without building a tree.
+
+    Attribute values are decoded the same way BeautifulSoup's
+    'html.parser' backend decodes them and valueless attributes
+    are given an empty string."""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.tags: list[tuple[str, dict[str, str]]] = []
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]):
+        self.tags.append(
+            (tag, {name: "" if value is None else value for name, value in attrs})
+        )
+
+    def pop_tags(self) -> list[tuple[str, dict[str, str]]]:
+        """Return and clear the tags collected so far."""
+        tags = self.tags
+        self.tags = []
+        return tags
+
+
+def validate_backend(backend: str, tree: bool = False):
+    """Raise a ValueError if `backend` isn't supported.
+
+    :param tree: Only allow backends that build a BeautifulSoup tree."""
+    allowed = TREE_BACKENDS if tree else BACKENDS
+    if backend not in allowed:
+        raise ValueError(f"Unknown backend {backend!r}, must be one of {allowed}.")
+
+
+def make_soup(source: str, backend: str = "html.parser") -> BeautifulSoup:
+    """Parse `source` into a BeautifulSoup tree with the given tree backend."""
+    validate_backend(backend, tree=True)
+    return BeautifulSoup(source, features=backend)
+
+
+def iter_soup_tags(soup: BeautifulSoup) -> Iterator[tuple[str, dict[str, str]]]:
+    """Yield the name and attributes of every tag in `soup` in document order."""
+    for element in soup.descendants:
+        if isinstance(element, Tag):
+            yield element.name, element.attrs
+
+
+def iter_stream_tags(source: str) -> Iterator[tuple[str, dict[str, str]]]:
+    """Yield the name and attributes of every start tag in `source`
+    in document order without building a tree."""
+    tokenizer = AttributeTokenizer()
+    for i in range(0, len(source), STREAM_CHUNK_SIZE):
+        tokenizer.feed(source[i : i + STREAM_CHUNK_SIZE])
+        yield from tokenizer.pop_tags()
+    tokenizer.close()
+    yield from tokenizer.pop_tags()
+
+
+def iter_tags(
+    source: str, backend: str = "html.parser"
+) -> Iterator[tuple[str, dict[str, str]]]:
+    """Yield the name and attributes of every tag in `source`
+    in document order using the given backend.
+
+    This is the interface shared by all backends.
+
+    :param backend: One of 'html.parser', 'lxml', or 'stream'."""
+    validate_backend(backend)
+    if backend in STREAM_BACKENDS:
+        return iter_stream_tags(source)
+    return iter_soup_tags(make_soup(source, backend))
@@ -0,0 +1,135 @@
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator
+
+from .backends import validate_backend
+from .page_extractor import EXTRACTORS, scrape_page, validate_extractors
+
+# Batches smaller than this are scraped in the calling process.
+SERIAL_THRESHOLD = 8
+
+Document = str | tuple[str, str]
+
+
+def scrape_batch(
+    batch: list[tuple[int, str, str]],
+    extractors: tuple[str, ...],
+    backend: str,
+    timed: bool = False,
+) -> list[dict[str, Any]]:
+    """Scrape a batch of (index, source, url) documents.
+
+    Returns a list of `ScrapedPage.to_dict()` results with an added 'index' key
+    and, if `timed` is True, a 'seconds' key.
+    Documents that fail to scrape get an 'error' key with the exception
+    instead of the results, so one bad page doesn't lose the rest of the batch.
+
+    Runs in the worker processes, only the returned data is sent back."""
+    results: list[dict[str, Any]] = []
+    for index, source, url in batch:
+        start = time.perf_counter()
+        try:
+            result = scrape_page(source, url, extractors, backend).to_dict()
+        except Exception as error:
+            result = {"error": format_error(error)}
+        result["index"] = index
+        if timed:
+            result["seconds"] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+def format_error(error: BaseException) -> str:
+    """Returns the exception's type and message, e.g. "OSError: [Errno 2] ..."."""
+    return f"{type(error).__name__}: {error}"
+
+
+def iter_jobs(documents: Iterable[Document]) -> Iterator[tuple[int, str, str]]:
+    """Yield (index, source, url) for each document."""
+    for index, document in enumerate(documents):
+        if isinstance(document, str):
+            yield index, document, ""
+        else:
+            source, url = document
+            yield index, source, url
+
+
+def scrape_many(
+    documents: Iterable[Document],
+    extractors: Iterable[str] = EXTRACTORS,
+    workers: int | None = None,
+    chunksize: int = 16,
+    ordered: bool = True,
+    backend: str = "html.parser",
+    timed: bool = False,
+) -> Iterator[dict[str, Any]]:
+    """Scrape many documents in parallel with a process pool.
+
+    Yields a dictionary for each document (see `ScrapedPage.to_dict()`)
+    with an added 'index' key giving the document's position in `documents`.
+    If a document can't be scraped, its dictionary only has an 'error' key
+    describing the exception, besides 'index' and 'seconds'.
+
+    :param documents: Html sources or (source, url) tuples.
+    The url is needed to format relative links.
+
+    :param extractors: Which of 'links', 'emails', 'phones', and 'inputs' to run.
+    Defaults to all of them.
+
+    :param workers: The number of processes to use. Defaults to `os.cpu_count()`.
+    If this is 1 or there are fewer than `SERIAL_THRESHOLD` documents,
+    everything is scraped in the calling process.
+
+    :param chunksize: The number of documents sent to a worker at a time.
+
+    :param ordered: Yield results in the same order as `documents`.
+    If False, results are yielded as soon as their batch is done.
+
+    :param backend: The tree building parser to use, either 'html.parser' or 'lxml'.
+
+    :param timed: Add a 'seconds' key with the time it took to scrape each document."""
+    extractors = tuple(extractors)
+    # Check the arguments here, since errors scraping a document are returned as results
+    validate_extractors(extractors)
+    validate_backend(backend, tree=True)
+    workers = workers or os.cpu_count() or 1
+    jobs = iter_jobs(documents)
+    head = list(islice(jobs, SERIAL_THRESHOLD))
+    if workers <= 1 or len(head) < SERIAL_THRESHOLD:
+        for job in chain(head, jobs):
+            yield from scrape_batch([job], extractors, backend, timed)
+        return
+    jobs = chain(head, jobs)
+    batches = enumerate(iter(lambda: list(islice(jobs, chunksize)), []))
+    # Limit how many batches are in flight or waiting to be yielded in order
+    max_batches = workers * 2
+    pending: dict[Future[list[dict[str, Any]]], int] = {}
+    finished: dict[int, list[dict[str, Any]]] = {}
+    next_batch = 0
+    executor = ProcessPoolExecutor(workers)
+    try:
+        while True:
+            while len(pending) + len(finished) < max_batches:
+                batch_number, batch = next(batches, (-1, []))
+                if not batch:
+                    break
+                future = executor.submit(
+                    scrape_batch, batch, extractors, backend, timed
+                )
+                pending[future] = batch_number
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                batch_number = pending.pop(future)
+                if ordered:
+                    finished[batch_number] = future.result()
+                else:
+                    yield from future.result()
+            while next_batch in finished:
+                yield from finished.pop(next_batch)
+                next_batch += 1
+    finally:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,241 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Hashable
+
+
+class LRUCache:
+    """A thread safe, bounded, least recently used cache
+    with optional expiration and hit/miss statistics.
+
+    >>> cache = LRUCache(maxsize=1000, ttl=3600)
+    >>> cache.set("key", "value")
+    >>> cache.get("key")
+    'value'
+    >>> cache.stats()
+    {'hits': 1, 'misses': 0, 'hit_rate': 1.0, 'size': 1, 'maxsize': 1000}
+
+    :param maxsize: The most entries to keep before evicting the least recently used.
+
+    :param ttl: Number of seconds entries stay valid for. If None, entries don't expire.
+    """
+
+    def __init__(self, maxsize: int = 100000, ttl: float | None = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        # key -> (value, expiration time or None)
+        self.entries: OrderedDict[Hashable, tuple[Any, float | None]] = OrderedDict()
+        self.lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self.lock:
+            entry = self.entries.get(key)
+            return entry is not None and not self.is_expired(entry)
+
+    def is_expired(self, entry: tuple[Any, float | None]) -> bool:
+        return entry[1] is not None and entry[1] < time.time()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Returns the value for `key` or `default` if it isn't cached or has expired."""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or self.is_expired(entry):
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return default
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: Hashable, value: Any):
+        """Cache `value` for `key`, evicting the least recently used entry if full."""
+        expires = None if self.ttl is None else time.time() + self.ttl
+        with self.lock:
+            self.entries[key] = (value, expires)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self.lock:
+            self.entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the number of hits and misses, the hit rate,
+        and the current and maximum number of entries."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+        }
+
+    def save(self, path: Path | str):
+        """Write the unexpired entries to a json file.
+
+        Keys and values need to be json serializable and keys need to be strings."""
+        with self.lock:
+            entries = [
+                [key, value, expires]
+                for key, (value, expires) in self.entries.items()
+                if not self.is_expired((value, expires))
+            ]
+        Path(path).write_text(json.dumps(entries), encoding="utf-8")
+
+    def load(self, path: Path | str):
+        """Add the unexpired entries from a json file written by `save()`.
+
+        Does nothing if the file doesn't exist."""
+        path = Path(path)
+        if not path.exists():
+            return
+        entries = json.loads(path.read_text(encoding="utf-8"))
+        with self.lock:
+            for key, value, expires in entries:
+                if not self.is_expired((value, expires)):
+                    self.entries[key] = (value, expires)
+                    self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+
+class SqliteCache:
+    """A bounded, least recently used cache stored in an sqlite database,
+    so entries persist between processes and runs.
+
+    Has the same `get()`, `set()`, `clear()`, and `stats()` interface as `LRUCache`.
+    Keys must be strings and values must be json serializable.
+
+    >>> cache = SqliteCache("results.db", maxsize=100000)
+
+    :param path: The database file. Use ':memory:' for a cache that isn't saved.
+
+    :param maxsize: The most entries to keep before evicting the least recently used.
+
+    :param flush_size: How many hits to record in memory before writing
+    when their entries were last used to the database. They're also written
+    before entries are evicted and when the cache is closed.
+    """
+
+    def __init__(self, path: Path | str, maxsize: int = 100000, flush_size: int = 1000):
+        self.path = str(path)
+        self.maxsize = maxsize
+        self.flush_size = flush_size
+        self.hits = 0
+        self.misses = 0
+        # key -> last use not yet written to the database
+        self.used: dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS entries "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL, used INTEGER NOT NULL)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS entries_used ON entries (used)"
+        )
+        self.connection.commit()
+        # Increasing counter recording when each entry was last used
+        self.clock = self.connection.execute(
+            "SELECT COALESCE(MAX(used), 0) FROM entries"
+        ).fetchone()[0]
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.count()
+
+    def count(self) -> int:
+        return self.connection.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def __contains__(self, key: str) -> bool:
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            return row is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Returns the value for `key` or `default` if it isn't cached."""
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT value FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return default
+            self.clock += 1
+            self.used[key] = self.clock
+            if len(self.used) >= self.flush_size:
+                self.flush()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def flush(self):
+        """Write the recorded hits to the database. The lock must be held."""
+        if self.used:
+            self.connection.executemany(
+                "UPDATE entries SET used = ? WHERE key = ?",
+                [(used, key) for key, used in self.used.items()],
+            )
+            self.connection.commit()
+            self.used.clear()
+
+    def set(self, key: str, value: Any):
+        """Cache `value` for `key`, evicting the least recently used entries if full."""
+        with self.lock:
+            # Evict by up to date use times
+            self.flush()
+            self.clock += 1
+            self.connection.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                (key, json.dumps(value), self.clock),
+            )
+            excess = self.count() - self.maxsize
+            if excess > 0:
+                self.connection.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY used LIMIT ?)",
+                    (excess,),
+                )
+            self.connection.commit()
+
+    def clear(self):
+        """Remove all entries and reset the statistics."""
+        with self.lock:
+            self.used.clear()
+            self.connection.execute("DELETE FROM entries")
+            self.connection.commit()
+            self.hits = 0
+            self.misses = 0
+
+    def close(self):
+        """Write the recorded hits and close the database."""
+        with self.lock:
+            self.flush()
+            self.connection.close()
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the number of hits and misses, the hit rate,
+        and the current and maximum number of entries."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "size": len(self),
+            "maxsize": self.maxsize,
+        }
@@ -0,0 +1,190 @@
+"""Scrape saved html files and write the results as json lines.
+
+    scrapetools archive/ "pages/**/*.html" -e emails,phones -o results.jsonl --checkpoint done.txt
+
+Each line is a `ScrapedPage.to_dict()` result with added 'path' and 'seconds' keys.
+Results are written as soon as they're scraped, so they aren't in input order.
+
+Files that can't be read or scraped get a line with 'path' and 'error' keys instead,
+are reported on stderr, and aren't added to the checkpoint, so resuming retries them.
+The exit status is 1 if any file failed."""
+
+import argparse
+import glob
+import json
+import sys
+from pathlib import Path
+from typing import IO, Any, Iterable, Iterator
+
+from .batch import format_error, scrape_many
+from .page_extractor import EXTRACTORS
+
+# Path given for a document read from stdin.
+STDIN = "-"
+
+
+def iter_paths(targets: Iterable[str], pattern: str) -> Iterator[str]:
+    """Yield the files named by `targets`.
+
+    Directories are searched recursively for files matching `pattern`
+    and targets containing wildcards are expanded as (recursive) globs."""
+    for target in targets:
+        if target == STDIN:
+            yield target
+        elif glob.has_magic(target):
+            for path in sorted(glob.iglob(target, recursive=True)):
+                if Path(path).is_file():
+                    yield path
+        elif Path(target).is_dir():
+            for path in sorted(Path(target).rglob(pattern)):
+                if path.is_file():
+                    yield str(path)
+        else:
+            yield target
+
+
+def read_checkpoint(path: Path | None) -> set[str]:
+    """Returns the paths recorded in a checkpoint file, if it exists."""
+    if path is None or not path.exists():
+        return set()
+    return set(path.read_text(encoding="utf-8").splitlines())
+
+
+def parse_extractors(value: str) -> list[str]:
+    """Returns the extractors in a comma separated list like 'emails,phones'."""
+    extractors = [extractor.strip() for extractor in value.split(",")]
+    for extractor in extractors:
+        if extractor not in EXTRACTORS:
+            raise argparse.ArgumentTypeError(
+                f"invalid extractor {extractor!r}, choose from {', '.join(EXTRACTORS)}"
+            )
+    return extractors
+
+
+def get_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="scrapetools", description=__doc__.splitlines()[0]
+    )
+    parser.add_argument(
+        "targets",
+        nargs="*",
+        default=[STDIN],
+        help="Files, directories, or globs to scrape. '-' reads a page from stdin, "
+        "which is the default if no targets are given.",
+    )
+    parser.add_argument(
+        "-e",
+        "--extractors",
+        type=parse_extractors,
+        default=list(EXTRACTORS),
+        help="Comma separated extractors to run, from "
+        f"{','.join(EXTRACTORS)}. Defaults to all of them.",
+    )
+    parser.add_argument(
+        "-o", "--output", type=Path, help="Write results to this file instead of stdout."
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        help="Number of processes to use. Defaults to the number of cpus.",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=16,
+        help="Number of files sent to a worker at a time.",
+    )
+    parser.add_argument(
+        "--pattern",
+        default="*.htm*",
+        help="Files to scrape in directory targets. Defaults to '*.htm*'.",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=("html.parser", "lxml"),
+        default="html.parser",
+        help="The html parser to use.",
+    )
+    parser.add_argument(
+        "--encoding", default="utf-8", help="Encoding of the files. Defaults to utf-8."
+    )
+    parser.add_argument(
+        "--url",
+        help="Url to resolve relative links against. Defaults to each file's 'file://' uri.",
+    )
+    parser.add_argument(
+        "--checkpoint",
+        type=Path,
+        help="Record finished files here and skip the ones it already lists. "
+        "Results are appended to --output when resuming.",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = get_args(argv)
+    finished = read_checkpoint(args.checkpoint)
+    # Document index -> path, for the documents that haven't been written yet
+    paths: dict[int, str] = {}
+    failures = 0
+
+    def write(result: dict[str, Any]):
+        nonlocal failures
+        output.write(json.dumps(result) + "\n")
+        output.flush()
+        if "error" in result:
+            failures += 1
+            print(f"scrapetools: {result['path']}: {result['error']}", file=sys.stderr)
+        elif checkpoint and result["path"] != STDIN:
+            checkpoint.write(result["path"] + "\n")
+            checkpoint.flush()
+
+    def iter_documents() -> Iterator[tuple[str, str]]:
+        index = 0
+        for path in iter_paths(args.targets, args.pattern):
+            if path in finished:
+                continue
+            if path == STDIN:
+                source = sys.stdin.read()
+                url = args.url or ""
+            else:
+                file = Path(path)
+                try:
+                    source = file.read_text(args.encoding, errors="replace")
+                except OSError as error:
+                    write({"path": path, "error": format_error(error)})
+                    continue
+                url = args.url or file.resolve().as_uri()
+            paths[index] = path
+            index += 1
+            yield source, url
+
+    output: IO[str] = sys.stdout
+    checkpoint: IO[str] | None = None
+    if args.output:
+        mode = "a" if args.checkpoint and finished else "w"
+        output = args.output.open(mode, encoding="utf-8")
+    if args.checkpoint:
+        checkpoint = args.checkpoint.open("a", encoding="utf-8")
+    try:
+        for result in scrape_many(
+            iter_documents(),
+            args.extractors,
+            workers=args.workers,
+            chunksize=args.chunksize,
+            ordered=False,
+            backend=args.backend,
+            timed=True,
+        ):
+            write({"path": paths.pop(result.pop("index")), **result})
+    finally:
+        if output is not sys.stdout:
+            output.close()
+        if checkpoint:
+            checkpoint.close()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,226 @@
+import asyncio
+import urllib.request
+from concurrent.futures import Executor
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable
+
+from .batch import scrape_batch
+from .link_scraper import LINK_TYPES, get_host
+from .link_store import LinkStore
+from .backends import validate_backend
+from .page_extractor import EXTRACTORS, validate_extractors
+
+Fetch = Callable[[str], Awaitable[str | None]]
+
+
+async def fetch_url(url: str, timeout: float = 30) -> str | None:
+    """Default fetch coroutine for `SiteCrawler`.
+
+    Downloads `url` with urllib in a thread and returns its text
+    or None if the response isn't html."""
+
+    def get() -> str | None:
+        request = urllib.request.Request(url, headers={"User-Agent": "scrapetools"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            if "html" not in response.headers.get("Content-Type", "html"):
+                return None
+            charset = response.headers.get_content_charset() or "utf-8"
+            return response.read().decode(charset, errors="replace")
+
+    return await asyncio.to_thread(get)
+
+
+def make_dict_fetcher(pages: dict[str, str]) -> Fetch:
+    """Returns a fetch coroutine that serves `pages` (url -> html)
+    instead of making requests. Unknown urls return None.
+
+    Useful for tests and for crawling pages that are already saved."""
+
+    async def fetch(url: str) -> str | None:
+        return pages.get(url)
+
+    return fetch
+
+
+class SiteCrawler:
+    """Concurrently crawls a site with asyncio, starting from `start_url`
+    and following the page links found by `LinkScraper`.
+
+    Fetching happens on the event loop while parsing and extraction
+    run in `executor`, so a slow page doesn't block other fetches.
+
+    >>> crawler = SiteCrawler("https://somewebsite.com")
+    >>> async for page in crawler.crawl():
+    ...     print(page["url"], page["emails"])
+
+    Each result is a `ScrapedPage.to_dict()` with an added 'index' key
+    giving the order pages were fetched in.
+
+    :param fetch: Coroutine function that takes a url and returns its html
+    or None to skip it. Defaults to `fetch_url()`.
+
+    :param max_pages: The most pages to fetch.
+
+    :param max_frontier: The most urls waiting to be fetched.
+    Links found while the frontier is full are dropped.
+
+    :param concurrency: The most pages being fetched or parsed at once.
+
+    :param per_host_limit: The most concurrent fetches to a single host.
+
+    :param same_site_only: Only follow links on the same host as `start_url`.
+
+    :param extractors: Which of 'links', 'emails', 'phones', and 'inputs' to run.
+    'links' is always run since it's needed to find pages.
+
+    :param executor: Where to run parsing and extraction.
+    Defaults to the event loop's default thread pool.
+    A `ProcessPoolExecutor` can be used to parse on multiple cores.
+
+    :param backend: The tree building parser to use, either 'html.parser' or 'lxml'."""
+
+    def __init__(
+        self,
+        start_url: str,
+        fetch: Fetch | None = None,
+        max_pages: int = 1000,
+        max_frontier: int = 10000,
+        concurrency: int = 16,
+        per_host_limit: int = 4,
+        same_site_only: bool = True,
+        extractors: Iterable[str] = EXTRACTORS,
+        executor: Executor | None = None,
+        backend: str = "html.parser",
+    ):
+        self.start_url = start_url.strip("/")
+        self.fetch = fetch or fetch_url
+        self.max_pages = max_pages
+        self.max_frontier = max_frontier
+        self.concurrency = concurrency
+        self.per_host_limit = per_host_limit
+        self.same_site_only = same_site_only
+        self.extractors = tuple(extractors)
+        validate_extractors(self.extractors)
+        validate_backend(backend, tree=True)
+        if "links" not in self.extractors:
+            self.extractors += ("links",)
+        self.executor = executor
+        self.backend = backend
+        self.host = get_host(self.start_url)
+        # Every url that's been added to the frontier
+        self.visited: set[str] = set()
+        # url -> error message for pages that couldn't be fetched or parsed
+        self.errors: dict[str, str] = {}
+        # Every link found on the crawled pages
+        self.links = LinkStore()
+        # Number of links not added because the frontier was full
+        self.dropped = 0
+        # Number of pages taken from the frontier
+        self.started = 0
+        self.host_limits: dict[str, asyncio.Semaphore] = {}
+
+    def should_follow(self, url: str) -> bool:
+        """Returns whether `url` should be added to the frontier."""
+        if url in self.visited or not url.startswith(("http://", "https://")):
+            return False
+        return not self.same_site_only or get_host(url) == self.host
+
+    def enqueue(self, frontier: asyncio.Queue[str], urls: Iterable[str]):
+        """Add new urls to the frontier while there's room and pages left."""
+        for url in urls:
+            if len(self.visited) >= self.max_pages:
+                return
+            if not self.should_follow(url):
+                continue
+            try:
+                frontier.put_nowait(url)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                continue
+            self.visited.add(url)
+
+    async def process(self, url: str, index: int) -> dict[str, Any] | None:
+        """Fetch and scrape a single page."""
+        host = get_host(url)
+        if host not in self.host_limits:
+            self.host_limits[host] = asyncio.Semaphore(self.per_host_limit)
+        async with self.host_limits[host]:
+            source = await self.fetch(url)
+        if source is None:
+            return None
+        loop = asyncio.get_running_loop()
+        results = await loop.run_in_executor(
+            self.executor,
+            scrape_batch,
+            [(index, source, url)],
+            self.extractors,
+            self.backend,
+        )
+        return results[0]
+
+    async def worker(
+        self,
+        frontier: asyncio.Queue[str],
+        results: asyncio.Queue[dict[str, Any]],
+    ):
+        while True:
+            url = await frontier.get()
+            try:
+                self.started += 1
+                result = await self.process(url, self.started - 1)
+                if result is not None and "error" in result:
+                    self.errors[url] = result["error"]
+                elif result is not None:
+                    for link_type in LINK_TYPES:
+                        self.links.update(result[f"{link_type}_links"], link_type)
+                    # Don't follow links that were merged in as image links
+                    img_links = set(result["img_links"])
+                    self.enqueue(
+                        frontier,
+                        (
+                            link
+                            for link in result["page_links"]
+                            if link not in img_links
+                        ),
+                    )
+                    await results.put(result)
+            except Exception as e:
+                self.errors[url] = f"{type(e).__name__}: {e}"
+            finally:
+                frontier.task_done()
+
+    async def crawl(self) -> AsyncIterator[dict[str, Any]]:
+        """Crawl the site, yielding each page's results as soon as it's done."""
+        frontier: asyncio.Queue[str] = asyncio.Queue(self.max_frontier)
+        results: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
+        self.enqueue(frontier, [self.start_url])
+        workers = [
+            asyncio.create_task(self.worker(frontier, results))
+            for _ in range(self.concurrency)
+        ]
+        finished = asyncio.create_task(frontier.join())
+        try:
+            while True:
+                getter = asyncio.create_task(results.get())
+                done, _ = await asyncio.wait(
+                    [getter, finished], return_when=asyncio.FIRST_COMPLETED
+                )
+                if getter in done:
+                    yield getter.result()
+                    continue
+                getter.cancel()
+                while not results.empty():
+                    yield results.get_nowait()
+                break
+        finally:
+            finished.cancel()
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, finished, return_exceptions=True)
+
+    def run(self) -> list[dict[str, Any]]:
+        """Crawl the site synchronously and return every page's results."""
+
+        async def collect() -> list[dict[str, Any]]:
+            return [page async for page in self.crawl()]
+
+        return asyncio.run(collect())
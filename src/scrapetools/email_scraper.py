@@ -1,78 +1,143 @@
-import re
-from string import printable
+from typing import Iterator, Literal, overload
 from urllib.parse import unquote
 
+from .instrumentation import stage
+from .patterns import (
+    AT_SIGN,
+    COMMON_TLDS,
+    LAST_WHITESPACE,
+    NON_WHITESPACE,
+    UNICODE_PREFIXES,
+    VALID_EMAIL_CHARACTERS,
+    compile_for,
+    get_file_extensions,
+    get_pattern,
+)
+from .prefilter import remove_code
+from .streams import DEFAULT_CHUNK_SIZE, Buffer, Stream, iter_windows
 
-def validate(email: str) -> bool:
+# `scrape_emails` works on whitespace separated chunks,
+# so text can be split on whitespace without changing what it finds.
+EMAIL_DELIMITERS = " \t\n\r\f\v"
+
+
+def get_rejection_reason(
+    email: str, extensions: frozenset[str] = get_file_extensions()
+) -> str | None:
+    """Returns the name of the first rule `email` breaks
+    or None if it's likely an email address.
+
+    Rules are checked cheapest first and checking stops at the first failure:
+
+    'at_count': contains exactly one '@'.
+    'no_dot': contains at least one '.'.
+    'bad_first_character': 1st character is not '@' or '.'.
+    'bad_last_character': last character is not '@' or '.'.
+    'dot_after_at': character after '@' is not '.'.
+    'no_dot_in_domain': '@' comes before the last '.'.
+    'consecutive_dots': no consecutive '.' in email.
+    'local_too_short': local is two or more characters.
+    'local_too_long': local part is 64 characters or less.
+    'domain_too_short': domain is more than 3 characters.
+    'underscore_in_domain': domain part doesn't contain any '_'.
+    'starts_with_www': doesn't start with 'www.'.
+    'file_extension': no part of the domain after the first '.' is a file extension.
+    'numeric_domain': domain doesn't consist of only numbers.
+    'numeric_local': local doesn't consist of only numbers.
+    'no_alpha_in_local': at least 1 character in local is alphabetical.
+
+    :param extensions: Lowercase file extensions without the leading '.',
+    see `patterns.get_file_extensions()`."""
+    if email.count("@") != 1:
+        return "at_count"
+    last_dot = email.rfind(".")
+    if last_dot == -1:
+        return "no_dot"
+    if email[0] in "@.":
+        return "bad_first_character"
+    if email[-1] in "@.":
+        return "bad_last_character"
+    atdex = email.find("@")
+    if email[atdex + 1] == ".":
+        return "dot_after_at"
+    if atdex > last_dot:
+        return "no_dot_in_domain"
+    if ".." in email:
+        return "consecutive_dots"
+    if atdex < 2:
+        return "local_too_short"
+    if atdex > 64:
+        return "local_too_long"
+    local = email[:atdex]
+    domain = email[atdex + 1 :]
+    if len(domain) <= 3:
+        return "domain_too_short"
+    if "_" in domain:
+        return "underscore_in_domain"
+    if email.startswith("www."):
+        return "starts_with_www"
+    labels = domain.lower().split(".")
+    if labels[-1] not in COMMON_TLDS and not extensions.isdisjoint(labels[1:]):
+        return "file_extension"
+    if domain.replace(".", "").isnumeric():
+        return "numeric_domain"
+    if local.replace(".", "").isnumeric():
+        return "numeric_local"
+    if not any(ch.isalpha() for ch in local):
+        return "no_alpha_in_local"
+    return None
+
+
+@overload
+def validate(
+    email: str,
+    explain: Literal[False] = False,
+    extra_extensions: list[str] | None = None,
+) -> bool: ...
+
+
+@overload
+def validate(
+    email: str, explain: Literal[True], extra_extensions: list[str] | None = None
+) -> tuple[bool, str | None]: ...
+
+
+def validate(
+    email: str, explain: bool = False, extra_extensions: list[str] | None = None
+) -> bool | tuple[bool, str | None]:
     """Checks string to see if it's likely an email address.
 
     Returns True or False.
 
     Some emails violating some of these rules
     may technically be valid, but are practically
-    never seen in use out in the wild."""
-    if email.count("@") != 1 or email.count(".") == 0:
-        return False
-    atdex = email.find("@")
-    last_dot = email.rfind(".")
-    local, domain = email.split("@")
-    # RULES:
-    #'@' comes before the last '.'
-    # local part is 64 characters or less
-    # domain part doesn't contain any '_'
-    # at least 1 character in local is alphabetical
-    # 1st character is not '@' or '.'
-    # last character is not '@' or '.'
-    # character after '@' is not '.'
-    # doesn't start with 'www.'
-    # local is two or more characters
-    # domain is more than 3 characters
-    # domain doesn't consist of only numbers
-    # local doesn't consist of only numbers
-    # no consecutive '.' in email
-    # email doesn't contain a listed file ext
-    if all(
-        [
-            atdex < last_dot,
-            len(local) <= 64,
-            domain.count("_") == 0,
-            any(ch.isalpha() for ch in local),
-            email[0] not in ["@", "."],
-            email[-1] not in ["@", "."],
-            email[email.find("@") + 1] != ".",
-            not email.startswith("www."),
-            len(local) >= 2,
-            len(domain) > 3,
-            not all(ch.isnumeric() for ch in domain.replace(".", "")),
-            not all(ch.isnumeric() for ch in local.replace(".", "")),
-            all(email[i - 1] != "." for i, ch in enumerate(email) if ch == "."),
-            all(
-                ext not in domain
-                for ext in [
-                    ".png",
-                    ".jpg",
-                    ".js",
-                    ".html",
-                    ".svg",
-                    ".jpeg",
-                    ".mp4",
-                    ".mpeg",
-                    ".css",
-                    ".pdf",
-                    ".wav",
-                    ".docx",
-                    ".txt",
-                    ".rtf",
-                    ".gif",
-                    ".webp",
-                    ".x.x",
-                ]
-            ),
-        ]
-    ):
-        return True
-    else:
-        return False
+    never seen in use out in the wild.
+
+    :param explain: Return a tuple of the result and the name of the rule
+    that rejected `email` (None if it's valid) instead of just the result.
+    See `get_rejection_reason()` for the rules.
+
+    :param extra_extensions: Extra file extensions to reject."""
+    reason = get_rejection_reason(
+        email, get_file_extensions(tuple(extra_extensions or ()))
+    )
+    if explain:
+        return reason is None, reason
+    return reason is None
+
+
+def count_valid_characters(text: str, start: int, stop: int) -> int:
+    """Counts consecutive valid email characters in `text`
+    starting at index `start` and moving towards, but not including, `stop`.
+
+    Scans backwards if `stop` is less than `start`."""
+    step = 1 if stop >= start else -1
+    count = 0
+    for i in range(start, stop, step):
+        if text[i] not in VALID_EMAIL_CHARACTERS:
+            break
+        count += 1
+    return count
 
 
 def find_last_valid_character_offset(text: str) -> int:
@@ -86,26 +151,14 @@ def find_last_valid_character_offset(text: str) -> int:
 
     If no invalid characters are found, the function will return
     'len(text)-1'."""
-
-    """ Technically some of these characters are valid in an email string,
-    but the ratio of how often they're used to how often they produce
-    false positives makes them worth disregarding. """
-    invalid_characters = " <>[]{},\"':;\\/#$%^&*()=+`?|\n\t\r"
     if text[-1] == "@" and text[0] != "@":
-        # reverse the string
-        text = text[::-1]
+        return count_valid_characters(text, len(text) - 2, -1)
     elif text[0] != "@":
         raise ValueError(
             'First or last character of text arg needs to be "@"\n',
             f"Argument {text} is invalid.",
         )
-    i = 1
-    while i < len(text):
-        if text[i] in invalid_characters or text[i] not in printable:
-            return i - 1
-        else:
-            i += 1
-    return len(text) - 1
+    return count_valid_characters(text, 1, len(text))
 
 
 def strip_unicode(emails: list[str]) -> list[str]:
@@ -113,48 +166,50 @@ def strip_unicode(emails: list[str]) -> list[str]:
     up at the front of email addresses and returns the list."""
     stripped_emails: list[str] = []
     for email in emails:
-        for text in ["u003e", "u00a0"]:
+        for text in UNICODE_PREFIXES:
             if text in email:
                 email = email[len(text) :]
         stripped_emails.append(email)
     return stripped_emails
 
 
-def scrape_emails_noregex(text: str) -> list[str]:
+def scrape_emails_noregex(
+    text: str, extra_extensions: list[str] | None = None
+) -> list[str]:
     """Extracts potential emails from given text
-    and returns as a list of strings."""
+    and returns as a list of strings.
+
+    :param extra_extensions: Extra file extensions to filter out."""
+    extensions = get_file_extensions(tuple(extra_extensions or ()))
     if "%" in text:
         # decode percent encoding
         text = unquote(text)
-    for ch in ["\n", "\t", "\r"]:
-        text = text.replace(ch, " ")
-    at_count = text.count("@")
+    # Works with indices into `text` instead of slicing out chunks
+    # so each character is only scanned a constant number of times.
     emails: list[str] = []
-    if at_count > 0:
-        last_stopdex = 0
-        for i in range(at_count):
-            atdex = text.find("@", last_stopdex)
-            next_atdex = text.find("@", atdex + 1)
-            try:
-                chunk = (
-                    text[last_stopdex:next_atdex]
-                    if next_atdex != -1
-                    else text[last_stopdex:]
-                )
-                chunk_atdex = chunk.find("@")
-                startdex = find_last_valid_character_offset(chunk[: chunk_atdex + 1])
-                stopdex = find_last_valid_character_offset(chunk[chunk_atdex:])
-                email = chunk[chunk_atdex - startdex : stopdex + chunk_atdex + 1]
-                while email[-1].isnumeric() or not email[-1].isalpha():
-                    email = email[:-1]
-                if validate(email):
-                    emails.append(email.lower())
-                """ The extra '+ 1' is to ensure last_stopdex increments
-                if 'len(email.split('@')[1])' is 0."""
-                last_stopdex = atdex + len(email.split("@")[1]) + 1
-            except Exception as e:
-                last_stopdex = atdex + 1
-        emails = sorted(list(set(strip_unicode(emails))))
+    last_stopdex = 0
+    atdex = text.find("@")
+    while atdex != -1:
+        next_atdex = text.find("@", atdex + 1)
+        chunk_stop = next_atdex if next_atdex != -1 else len(text)
+        # Valid characters on either side of '@', without going
+        # back past the last email or forward into the next '@'
+        start = atdex - count_valid_characters(text, atdex - 1, last_stopdex - 1)
+        stop = atdex + 1 + count_valid_characters(text, atdex + 1, chunk_stop)
+        # Drop trailing characters until the email ends with a letter
+        while stop > start and not text[stop - 1].isalpha():
+            stop -= 1
+        if stop <= atdex + 1:
+            # Nothing valid is left after the '@'
+            last_stopdex = atdex + 1
+        else:
+            email = text[start:stop]
+            if get_rejection_reason(email, extensions) is None:
+                emails.append(email.lower())
+            last_stopdex = stop
+        atdex = next_atdex
+    if emails:
+        emails = sorted(set(strip_unicode(emails)))
     return emails
 
 
@@ -165,72 +220,122 @@ def filter_out_files(
     instead of domains.
 
     :param additional_extensions: Extra file extensions to filter out."""
-    ext = [
-        "png",
-        "jpg",
-        "js",
-        "html",
-        "svg",
-        "jpeg",
-        "mp4",
-        "mpeg",
-        "css",
-        "pdf",
-        "wav",
-        "docx",
-        "txt",
-        "rtf",
-        "gif",
-        "webp",
-        "x",
-    ]
-    if additional_extensions:
-        ext.extend([extension.strip(".") for extension in additional_extensions])
-    ignore = "$|".join(ext) + "$"
-    pattern = r".*[.](?!" + ignore + r")[^.]*$"
-    # Lazy evaluation means we can skip the regex overhead for common domains
+    extensions = get_file_extensions(tuple(additional_extensions or ()))
     return [
         email
         for email in emails
-        if email[email.rfind(".") + 1 :]
-        in ["com", "org", "net", "us", "io", "edu", "gov", "biz"]
-        or re.search(pattern, email.lower())
+        if email[email.rfind(".") + 1 :].lower() not in extensions
     ]
 
 
 def replace_unicodehex(text: str) -> str:
     """Replace unicode hex strings (u003e etc.) with a space."""
-    return re.sub(r"u00[a-zA-Z0-9]{2}", " ", text)
+    return get_pattern("unicode_hex").sub(" ", text)
+
+
+def find_chunks_with_at(text: str | Buffer) -> list[str | Buffer]:
+    """Returns the whitespace delimited chunks of `text` that contain an '@'
+    as slices of `text`, so only those parts are copied.
 
+    Scans each character about twice, no matter how long the chunks are.
 
-def scrape_emails(text: str, extra_extensions: list[str] | None = None) -> list[str]:
+    :param text: A string or bytes-like object."""
+    at_sign = compile_for(AT_SIGN, text)
+    last_whitespace = compile_for(LAST_WHITESPACE, text)
+    non_whitespace = compile_for(NON_WHITESPACE, text)
+    chunks: list[str | Buffer] = []
+    # Start of the text after the last chunk
+    last_stopdex = 0
+    for match in at_sign.finditer(text):
+        atdex = match.start()
+        if atdex < last_stopdex:
+            # Already part of the last chunk
+            continue
+        whitespace = last_whitespace.match(text, last_stopdex, atdex)
+        start = whitespace.end() if whitespace else last_stopdex
+        last_stopdex = non_whitespace.match(text, atdex).end()
+        chunks.append(text[start:last_stopdex])
+    return chunks
+
+
+def scrape_emails(
+    text: str | Buffer,
+    extra_extensions: list[str] | None = None,
+    encoding: str = "utf-8",
+    skip_code: bool = False,
+) -> list[str]:
     """Extract emails from text using regex.
 
-    :param text: The text to scrape.
+    :param text: The text to scrape. Can also be a bytes-like object or mmap,
+    which is scanned without decoding or copying all of it.
 
-    :param extra_extensions: Extra file extensions to filter out."""
-    # Remove chunks with no "@" in them to reduce processing
-    text = unquote(" ".join(chunk.lower() for chunk in text.split() if "@" in chunk))
+    :param extra_extensions: Extra file extensions to filter out.
+
+    :param encoding: Used to decode the parts of `text` that contain an '@'
+    when `text` isn't a string. Must be ascii compatible, like utf-8 or latin-1.
+
+    :param skip_code: Ignore the contents of script and style elements and data uris.
+    """
+    if skip_code:
+        with stage("emails", "remove_code", len(text)):
+            text = remove_code(text)
+    # Only keep the chunks with an "@" in them to reduce processing
+    with stage("emails", "prefilter", len(text)):
+        chunks = find_chunks_with_at(text)
+        if isinstance(text, str):
+            text = " ".join(chunk.lower() for chunk in chunks)  # type: ignore
+        else:
+            text = " ".join(str(chunk, encoding, "replace").lower() for chunk in chunks)
 
     # Replace any % encoding or unicode hex strings with spaces
-    text = replace_unicodehex(text)
-
-    # Validation:
-    # Starts with an alphanumeric character.
-    # Local part consists of 1-63 alphanumeric + '._-' characters.
-    # Contains a single '@' character not at the beginning or end of a string.
-    # Domain consists of one or more alphanumeric + '_-' characters
-    # followed by a '.' and one or more alphanumeric + '._-' characters
-    # and ending in an alphabetical character.
-    pattern = (
-        r"[a-zA-Z0-9]{1}[a-zA-Z0-9._-]{1,63}@[a-zA-Z0-9_-]+\.[a-zA-Z0-9._-]+[a-zA-Z]{1}"
-    )
+    with stage("emails", "unquote", len(text)):
+        text = unquote(text)
+    with stage("emails", "unicode_hex", len(text)):
+        text = replace_unicodehex(text)
 
-    # Match pattern but throw out duplicates and anything that has only numbers in the local part of the address.
-    emails = [
-        email.lower()
-        for email in set(re.findall(pattern, text))
-        if not email.split("@")[0].isnumeric()
-    ]
-    # Remove anything that looks like a file and sort the final results
-    return sorted(filter_out_files(emails))
+    # See `patterns.EMAIL_REGEX` for what the pattern matches
+    pattern = get_pattern("email")
+    with stage("emails", "regex", len(text)) as timer:
+        candidates = set(pattern.findall(text))
+        timer.candidates = len(candidates)
+
+    # Throw out anything that doesn't validate, like addresses with
+    # only numbers in the local part or file extensions for domains.
+    extensions = get_file_extensions(tuple(extra_extensions or ()))
+    with stage("emails", "validate") as timer:
+        emails = sorted(
+            email
+            for email in candidates
+            if get_rejection_reason(email, extensions) is None
+        )
+        timer.candidates = len(candidates)
+        timer.accepted = len(emails)
+    return emails
+
+
+def iter_emails(
+    stream: Stream,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str = "utf-8",
+    extra_extensions: list[str] | None = None,
+) -> Iterator[str]:
+    """Extract emails from a stream of text without reading all of it into memory.
+
+    Yields each email once, as soon as the chunk containing it has been scanned.
+
+    :param stream: A string, bytes-like object, mmap,
+    text or binary file object, or an iterable of strings or bytes.
+
+    :param chunk_size: The approximate number of characters to scan at a time.
+
+    :param encoding: Used to decode bytes.
+
+    :param extra_extensions: Extra file extensions to filter out."""
+    seen: set[str] = set()
+    for window in iter_windows(
+        stream, EMAIL_DELIMITERS, chunk_size=chunk_size, encoding=encoding
+    ):
+        for email in scrape_emails(window, extra_extensions):
+            if email not in seen:
+                seen.add(email)
+                yield email
@@ -1,10 +1,156 @@
-from bs4 import BeautifulSoup
+from typing import Any
+
 from bs4.element import Tag
 
+from .backends import make_soup
+from .instrumentation import stage
+
+# Tags collected by `scrape_inputs`, other than forms.
+FIELD_TAGS = ("input", "button", "select", "textarea")
+# The type browsers give a field without a 'type' attribute.
+DEFAULT_TYPES = {
+    "input": "text",
+    "button": "submit",
+    "select": "select-one",
+    "textarea": "textarea",
+}
+
+
+class InputRecord:
+    """A lightweight, picklable copy of a form or input element.
+
+    Holds no reference to the parsed tree, so the tree can be freed
+    as soon as the records are made.
+
+    :param tag: The element's tag name.
+
+    :param attrs: The element's attributes. Multi-valued attributes,
+    like 'class', are joined with spaces.
+
+    :param form_id: The 'id' of the enclosing form, or the form's own 'id' for forms.
+
+    :param form_action: The 'action' of the enclosing form, or the form's own 'action' for forms.
+
+    :param fields: For forms, records for the fields inside the form.
+    Empty for other elements."""
+
+    __slots__ = ("tag", "attrs", "form_id", "form_action", "fields")
+
+    def __init__(
+        self,
+        tag: str,
+        attrs: dict[str, str],
+        form_id: str | None = None,
+        form_action: str | None = None,
+    ):
+        self.tag = tag
+        self.attrs = attrs
+        self.form_id = form_id
+        self.form_action = form_action
+        self.fields: list[InputRecord] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"InputRecord(tag={self.tag!r}, name={self.name!r}, type={self.type!r}, "
+            f"form_id={self.form_id!r}, fields={len(self.fields)})"
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, InputRecord):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    @property
+    def name(self) -> str | None:
+        """The element's 'name' attribute."""
+        return self.attrs.get("name")
+
+    @property
+    def type(self) -> str | None:
+        """The element's 'type' attribute, or the type browsers default to
+        if it doesn't have one. None for forms."""
+        return self.attrs.get("type", DEFAULT_TYPES.get(self.tag))
+
+    @property
+    def field_names(self) -> list[str | None]:
+        """The names of the fields in a form."""
+        return [field.name for field in self.fields]
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the record as plain, json serializable data."""
+        return {
+            "tag": self.tag,
+            "attrs": self.attrs,
+            "form_id": self.form_id,
+            "form_action": self.form_action,
+            "fields": [field.to_dict() for field in self.fields],
+        }
+
+
+def get_attrs(tag: Tag) -> dict[str, str]:
+    """Returns `tag`'s attributes with multi-valued ones joined by spaces."""
+    return {
+        name: " ".join(value) if isinstance(value, list) else value
+        for name, value in tag.attrs.items()
+    }
+
+
+class InputCollector:
+    """Collects forms and the input elements that aren't inside a form
+    from tags visited in document order, without modifying the tree.
+
+    :param structured: Collect `InputRecord`s instead of the Tag elements."""
+
+    def __init__(self, structured: bool = False):
+        self.structured = structured
+        self.forms: list[Any] = []
+        self.elements: dict[str, list[Any]] = {name: [] for name in FIELD_TAGS}
+        # Form Tag id -> its record
+        self.form_records: dict[int, InputRecord] = {}
+
+    def visit(self, tag: Tag):
+        if tag.name == "form":
+            if self.structured:
+                record = InputRecord(
+                    "form", get_attrs(tag), tag.get("id"), tag.get("action")
+                )
+                self.form_records[id(tag)] = record
+                self.forms.append(record)
+            else:
+                self.forms.append(tag)
+        elif tag.name in self.elements:
+            form = tag.find_parent("form")
+            if not self.structured:
+                if form is None:
+                    self.elements[tag.name].append(tag)
+                return
+            if form is None:
+                self.elements[tag.name].append(InputRecord(tag.name, get_attrs(tag)))
+            else:
+                form_record = self.form_records[id(form)]
+                form_record.fields.append(
+                    InputRecord(
+                        tag.name,
+                        get_attrs(tag),
+                        form_record.form_id,
+                        form_record.form_action,
+                    )
+                )
+
+    def results(self) -> tuple[list[Any], list[Any], list[Any], list[Any], list[Any]]:
+        """Returns the forms, inputs, buttons, select elements, and text areas."""
+        return (
+            self.forms,
+            self.elements["input"],
+            self.elements["button"],
+            self.elements["select"],
+            self.elements["textarea"],
+        )
+
 
 def scrape_inputs(
-    source: str,
-) -> tuple[list[Tag], list[Tag], list[Tag], list[Tag], list[Tag]]:
+    source: str, backend: str = "html.parser", structured: bool = False
+) -> tuple[list[Any], list[Any], list[Any], list[Any], list[Any]]:
     """Searches html for various user input elements.
 
     Returns a tuple where each element is a list of BeautifulSoup Tag elements.
@@ -13,14 +159,18 @@ def scrape_inputs(
     and text_areas. If an element type was not found, it will be an empty list.
 
     The inputs, buttons, select elements, and text_areas are ones
-    not already found in a form element."""
-    soup = BeautifulSoup(source, "html.parser")
-    forms = soup("form")
-    for form in forms:
-        form.extract()
-    inputs = soup("input")
-    buttons = soup("button")
-    selects = soup("select")
-    text_areas = soup("textAreas")
-
-    return forms, inputs, buttons, selects, text_areas
+    not already found in a form element.
+
+    :param backend: The tree building parser to use, either 'html.parser' or 'lxml'.
+
+    :param structured: Return `InputRecord`s instead of Tag elements.
+    The fields inside each form are in the form record's `fields`.
+    The records don't keep the parsed tree alive and are cheap to pickle."""
+    with stage("inputs", "parse", len(source)):
+        soup = make_soup(source, backend)
+    collector = InputCollector(structured)
+    with stage("inputs", "traverse", len(source)):
+        for element in soup.descendants:
+            if isinstance(element, Tag):
+                collector.visit(element)
+    return collector.results()
@@ -0,0 +1,157 @@
+"""Opt-in timing and counting of the scrapers' internal stages.
+
+Nothing is recorded unless a hook is installed, either globally with `add_hook()`
+or for the current thread/task with the `record()` context manager.
+Without hooks, each stage costs a function call and a context variable lookup.
+
+>>> with record() as recorder:
+...     scrapetools.scrape_emails(source)
+>>> recorder.to_dict()["emails"]["regex"]
+{'calls': 1, 'seconds': 0.0004, 'bytes': 5120, 'candidates': 12, 'accepted': 10}
+>>> print(recorder.to_prometheus())"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+Hook = Callable[["Stage"], None]
+
+global_hooks: list[Hook] = []
+context_hooks: ContextVar[tuple[Hook, ...]] = ContextVar("context_hooks", default=())
+
+
+class Stage:
+    """Timing and counts for one run of a scraper stage.
+
+    Set `candidates` and `accepted` inside the `with` block
+    for stages that filter their input.
+
+    Hooks are called with the finished stage."""
+
+    __slots__ = (
+        "scraper",
+        "name",
+        "bytes",
+        "candidates",
+        "accepted",
+        "start",
+        "seconds",
+        "hooks",
+    )
+
+    def __init__(self, scraper: str, name: str, size: int, hooks: tuple[Hook, ...]):
+        self.scraper = scraper
+        self.name = name
+        self.bytes = size
+        self.candidates = 0
+        self.accepted = 0
+        self.seconds = 0.0
+        self.hooks = hooks
+
+    def __enter__(self) -> "Stage":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args: Any):
+        self.seconds = time.perf_counter() - self.start
+        for hook in self.hooks:
+            hook(self)
+
+
+class NullStage:
+    """Stand in for `Stage` when nothing is being recorded."""
+
+    def __enter__(self) -> "NullStage":
+        return self
+
+    def __exit__(self, *args: Any):
+        pass
+
+    def __setattr__(self, name: str, value: Any):
+        pass
+
+
+null_stage = NullStage()
+
+
+def stage(scraper: str, name: str, size: int = 0) -> Stage | NullStage:
+    """Returns a context manager that times a stage of `scraper`
+    and reports it to any installed hooks.
+
+    :param size: The number of bytes or characters the stage processes."""
+    hooks = context_hooks.get()
+    if global_hooks:
+        hooks += tuple(global_hooks)
+    if not hooks:
+        return null_stage
+    return Stage(scraper, name, size, hooks)
+
+
+def add_hook(hook: Hook):
+    """Call `hook` with every finished `Stage` in every thread."""
+    global_hooks.append(hook)
+
+
+def remove_hook(hook: Hook):
+    """Stop calling a hook added with `add_hook()`."""
+    global_hooks.remove(hook)
+
+
+class Recorder:
+    """Hook that totals the time, bytes, and counts of each stage.
+
+    Can be passed to `add_hook()` or created with `record()`."""
+
+    FIELDS = ("calls", "seconds", "bytes", "candidates", "accepted")
+
+    def __init__(self):
+        # scraper -> stage -> field -> total
+        self.stats: dict[str, dict[str, dict[str, float]]] = {}
+
+    def __call__(self, stage: Stage):
+        totals = self.stats.setdefault(stage.scraper, {}).setdefault(
+            stage.name, dict.fromkeys(self.FIELDS, 0)
+        )
+        totals["calls"] += 1
+        totals["seconds"] += stage.seconds
+        totals["bytes"] += stage.bytes
+        totals["candidates"] += stage.candidates
+        totals["accepted"] += stage.accepted
+
+    def clear(self):
+        self.stats.clear()
+
+    def to_dict(self) -> dict[str, dict[str, dict[str, float]]]:
+        """Returns a copy of the totals as {scraper: {stage: {field: total}}}."""
+        return {
+            scraper: {name: dict(totals) for name, totals in stages.items()}
+            for scraper, stages in self.stats.items()
+        }
+
+    def to_prometheus(self, prefix: str = "scrapetools") -> str:
+        """Returns the totals in the Prometheus text exposition format."""
+        lines: list[str] = []
+        for field in self.FIELDS:
+            metric = f"{prefix}_stage_{field}_total"
+            lines.append(f"# TYPE {metric} counter")
+            for scraper, stages in self.stats.items():
+                for name, totals in stages.items():
+                    labels = f'scraper="{scraper}",stage="{name}"'
+                    lines.append(f"{metric}{{{labels}}} {totals[field]}")
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def record(recorder: Recorder | None = None) -> Iterator[Recorder]:
+    """Record the stages run in the current thread or task
+    while the context is active.
+
+    :param recorder: Recorder to add the stages to. A new one is created if not given.
+    """
+    recorder = recorder or Recorder()
+    token = context_hooks.set(context_hooks.get() + (recorder,))
+    try:
+        yield recorder
+    finally:
+        context_hooks.reset(token)
@@ -1,43 +1,147 @@
 import html
-import re
-from typing import Any
-from urllib.parse import urlparse, urlunparse
+from functools import lru_cache
+from typing import Any, Iterable, Iterator
+from urllib.parse import urljoin, urlparse, urlsplit, urlunparse
 
 from bs4 import BeautifulSoup
 
+from .backends import iter_soup_tags, iter_stream_tags, make_soup, validate_backend
+from .instrumentation import stage
+from .patterns import IMAGE_EXTENSIONS, LINK_WINDOW, get_pattern, is_default_pattern
+from .prefilter import remove_code
+
+LINK_TYPES = ("page", "img", "script")
+
+# (tag, attribute, link type) rules used to harvest links from tag attributes.
+LINK_RULES = [
+    ("a", "href", "page"),
+    ("link", "href", "page"),
+    ("source", "src", "page"),
+    ("div", "src", "page"),
+    ("div", "data-src", "page"),
+    ("div", "data-url", "page"),
+    ("div", "href", "page"),
+    ("img", "src", "img"),
+    ("img", "data-src", "img"),
+    ("script", "src", "script"),
+]
+
+# Attributes holding a comma separated list of urls with descriptors,
+# e.g. srcset="small.jpg 480w, large.jpg 1080w"
+MULTI_URL_ATTRIBUTES = ("srcset", "imagesrcset")
+
+# The most links `normalize_link()` remembers, a few MB at typical url lengths.
+LINK_CACHE_SIZE = 16384
+
+
+def get_host(url: str) -> str:
+    """Returns the netloc of `url` without a leading 'www.'."""
+    return urlsplit(url).netloc.removeprefix("www.")
+
+
+@lru_cache(maxsize=LINK_CACHE_SIZE)
+def normalize_link(link: str, base_url: str) -> tuple[str, str] | None:
+    """Cleans `link` and resolves it against `base_url` the same way `urljoin` does.
+
+    Returns the full url, without leading or trailing forward slashes,
+    and its host (see `get_host()`) or None if `link` isn't a url.
+
+    Results are memoized since the same links (navigation, footers, etc.)
+    show up on every page of a site. The memo is shared by every `LinkScraper`
+    in the process, isn't freed by `LinkScraper.release()`,
+    and holds up to `LINK_CACHE_SIZE` links. `normalize_link.cache_clear()` empties it."""
+    link = link.strip(" \n\t\r").replace('"', "").replace("\\", "").replace("'", "")
+    if "@" in link or " " in link:
+        return None
+    url = urljoin(base_url, link)
+    return url.strip("/"), get_host(url)
+
+
+def split_srcset(value: str) -> list[str]:
+    """Returns the urls from a srcset style attribute value."""
+    return [candidate.split()[0] for candidate in value.split(",") if candidate.strip()]
+
 
 class LinkScraper:
-    def __init__(self, html_src: str, page_url: str):
+    def __init__(
+        self,
+        html_src: str,
+        page_url: str,
+        soup: BeautifulSoup | None = None,
+        backend: str = "html.parser",
+        rules: list[tuple[str, str, str]] | None = None,
+        skip_code: bool = False,
+        max_tree_size: int | None = None,
+    ):
+        """:param soup: An already parsed tree of `html_src`.
+        If given, the source won't be parsed again.
+
+        :param backend: The parser to use, one of 'html.parser', 'lxml', or 'stream'.
+        'stream' doesn't build a tree and `self.soup` will be None.
+
+        :param rules: (tag, attribute, link type) rules to harvest links with.
+        Defaults to `LINK_RULES`. More can be added with `add_rule()`.
+
+        :param skip_code: Don't search the contents of script and style elements
+        and data uris for urls. Links in tag attributes, like script sources, are still found.
+
+        :param max_tree_size: Sources longer than this many characters are scraped
+        with the 'stream' backend instead of building a tree,
+        which bounds memory use for huge or pathological documents.
+        """
+        validate_backend(backend)
+        if soup is None and max_tree_size is not None and len(html_src) > max_tree_size:
+            backend = "stream"
         self.source = html_src
-        self.soup = BeautifulSoup(html_src, features="html.parser")
+        self.backend = backend
+        self.skip_code = skip_code
+        if soup is None and backend != "stream":
+            with stage("links", "parse", len(html_src)):
+                soup = make_soup(html_src, backend)
+        self.soup = soup
+        self.rules: dict[str, list[tuple[str, str]]] = {}
+        for tag_name, attribute, link_type in LINK_RULES if rules is None else rules:
+            self.add_rule(tag_name, attribute, link_type)
+        # Unprocessed attribute values for each link type
+        self.raw_links: dict[str, list[str]] = {
+            link_type: [] for link_type in LINK_TYPES
+        }
+        self.collected = False
+        self.released = False
+        self.page_url = page_url
         self.parsed_url = urlparse(page_url)
+        # Base for links that don't depend on the page's path
+        self.origin = urlunparse(self.parsed_url[:2] + ("", "", "", ""))
+        self.host = get_host(page_url)
+        # url -> host for every link that's been formatted
+        self.link_hosts: dict[str, str] = {}
         self.page_links = []
         self.img_links = []
         self.script_links = []
 
     def format_relative_links(self, links: list[str]) -> list[str]:
-        """Parses list of links and constructs a full url
-        according to self.parsed_url for the ones that don't have a
-        'netloc' property returned by urlparse.
+        """Resolves each link against the page url like `urljoin` does,
+        so relative links become full urls.
 
         Full urls are returned unedited other than stripping any
-        leading or trailing forward slashes."""
+        leading or trailing forward slashes.
+
+        Links containing '@' or spaces are dropped."""
         formatted_links: list[str] = []
         for link in links:
-            link = (
-                link.strip(" \n\t\r")
-                .replace('"', "")
-                .replace("\\", "")
-                .replace("'", "")
+            # Links with a host or that start with '/' resolve the same on every page
+            # of the site, which lets `normalize_link()` reuse them across pages.
+            # A scheme alone isn't enough, 'https:page' is relative to the page.
+            base_url = (
+                self.origin
+                if link.startswith("/") or urlsplit(link).netloc
+                else self.page_url
             )
-            parsed_url = urlparse(link)
-            if all(ch not in link for ch in "@ "):
-                parsed_url = list(parsed_url)
-                if parsed_url[0] == "":
-                    parsed_url[0] = self.parsed_url.scheme
-                if parsed_url[1] == "":
-                    parsed_url[1] = self.parsed_url.netloc
-                formatted_links.append(urlunparse(parsed_url).strip("/"))
+            normalized = normalize_link(link, base_url)
+            if normalized is not None:
+                url, host = normalized
+                self.link_hosts[url] = host
+                formatted_links.append(url)
         return formatted_links
 
     def remove_duplicates(self, obj: list[Any]) -> list[Any]:
@@ -46,11 +150,75 @@ class LinkScraper:
 
     def process_links(self, links: list[str]) -> list[str]:
         """Formats relative links, removes duplicates, and sorts in alphabetical order."""
-        return sorted(self.remove_duplicates(self.format_relative_links(links)))
+        with stage("links", "normalize") as timer:
+            processed = sorted(
+                self.remove_duplicates(self.format_relative_links(links))
+            )
+            timer.candidates = len(links)
+            timer.accepted = len(processed)
+        return processed
+
+    def add_rule(self, tag_name: str, attribute: str, link_type: str = "page"):
+        """Harvest links of `link_type` from `attribute` of `tag_name` elements.
+
+        e.g. scraper.add_rule("iframe", "src") or scraper.add_rule("img", "srcset", "img")
+
+        :param link_type: Can be 'page', 'img', or 'script'."""
+        if link_type not in LINK_TYPES:
+            raise ValueError(
+                f"Unknown link type {link_type!r}, must be one of {LINK_TYPES}."
+            )
+        rule = (attribute, link_type)
+        tag_rules = self.rules.setdefault(tag_name, [])
+        if rule not in tag_rules:
+            tag_rules.append(rule)
+        self.collected = False
+
+    def iter_tags(self) -> Iterator[tuple[str, dict[str, str]]]:
+        """Yield the name and attributes of every tag on the page in document order."""
+        if self.soup is None:
+            return iter_stream_tags(self.source)
+        return iter_soup_tags(self.soup)
+
+    def collect(self, tag_name: str, attrs: dict[str, str]):
+        """Apply `self.rules` to a single tag and store
+        any link values in `self.raw_links`.
+
+        Filters out fragments."""
+        for attribute, link_type in self.rules.get(tag_name, ()):
+            value = attrs.get(attribute)
+            if not isinstance(value, str):
+                continue
+            values = (
+                split_srcset(value) if attribute in MULTI_URL_ATTRIBUTES else [value]
+            )
+            self.raw_links[link_type].extend(
+                value for value in values if "#" not in value
+            )
+
+    def collect_links(self) -> dict[str, list[str]]:
+        """Harvest unprocessed links for every link type
+        with a single traversal of the page."""
+        if not self.collected:
+            self.raw_links = {link_type: [] for link_type in LINK_TYPES}
+            with stage("links", "collect", len(self.source)) as timer:
+                for tag_name, attrs in self.iter_tags():
+                    self.collect(tag_name, attrs)
+                timer.accepted = sum(len(links) for links in self.raw_links.values())
+            self.collected = True
+        return self.raw_links
 
     def find_all(self, tag_name: str, attribute_name: str) -> list[str]:
         """Finds all results according to tag_name and attribute_name.\n
         Filters out fragments."""
+        if self.soup is None:
+            return [
+                attrs[attribute_name]
+                for name, attrs in self.iter_tags()
+                if name == tag_name
+                and attribute_name in attrs
+                and "#" not in attrs[attribute_name]
+            ]
         return [
             tag.get(attribute_name)
             for tag in self.soup(tag_name, recursive=True)
@@ -59,42 +227,34 @@ class LinkScraper:
         ]
 
     def filter_same_site(self, links: list[str]) -> list[str]:
-        """Filters out links that don't match self.parsed_url.netloc"""
+        """Filters out links that don't match self.parsed_url.netloc,
+        ignoring a leading 'www.'."""
         return [
             link
             for link in links
-            if urlparse(link).netloc.strip("www.")
-            == self.parsed_url.netloc.strip("www.")
+            if (self.link_hosts.get(link) or get_host(link)) == self.host
         ]
 
     def scrape_page_links(self):
         """Scrape links according to tags and attributes."""
-        links: list[str] = []
-        for tag, attribute in [
-            ("a", "href"),
-            ("link", "href"),
-            ("source", "src"),
-            ("div", "src"),
-            ("div", "data-src"),
-            ("div", "data-url"),
-            ("div", "href"),
-        ]:
-            links.extend(self.find_all(tag, attribute))
-        links.extend(self.scrape_regex())
-        self.page_links = self.process_links(links)
+        self.page_links = self.process_links(
+            self.collect_links()["page"] + self.scrape_regex()
+        )
 
     def scrape_img_links(self):
         """Scrape links from src attribute of <img> tags."""
-        self.img_links = self.process_links(
-            self.find_all("img", "src") + self.find_all("img", "data-src")
-        )
+        self.img_links = self.process_links(self.collect_links()["img"])
 
     def scrape_script_links(self):
         """Scrape script links from src attribute of <script> tags."""
-        self.script_links = self.process_links(self.find_all("script", "src"))
+        self.script_links = self.process_links(self.collect_links()["script"])
+
+    def scrape_page(self, release: bool = False):
+        """Scrape all link types.
 
-    def scrape_page(self):
-        """Scrape all link types."""
+        :param release: Call `release()` afterwards so only the link lists are kept."""
+        if self.released:
+            raise RuntimeError("Can't scrape after the scraper has been released.")
         for scrape in [
             self.scrape_page_links,
             self.scrape_img_links,
@@ -102,43 +262,59 @@ class LinkScraper:
         ]:
             scrape()
         self.merge_image_links_from_non_img_tags()
+        if release:
+            self.release()
+
+    def release(self):
+        """Drop the page source, the parsed tree, and the unprocessed links.
+
+        The tree is often several times the size of the source,
+        so scrapers kept around after scraping, e.g. in a crawl queue,
+        should be released to only hold on to the scraped links.
+        The page can't be scraped again afterwards.
+
+        Links memoized by `normalize_link()` aren't owned by the scraper and stay cached."""
+        self.source = ""
+        self.soup = None
+        self.raw_links = {link_type: [] for link_type in LINK_TYPES}
+        self.released = True
 
     def merge_image_links_from_non_img_tags(self):
         """Finds links in self.script_links and self.page_links
         that have one of these image file extensions and adds them
         to self.img_links"""
-        formats = [
-            ".jpg",
-            ".jpeg",
-            ".png",
-            ".svg",
-            ".bmp",
-            ".tiff",
-            ".eps",
-            ".gif",
-            ".jfif",
-            ".webp",
-            ".heif",
-            ".avif",
-            ".bat",
-            ".bpg",
-        ]
         for link in self.script_links + self.page_links:
-            if any(ext in link for ext in formats):
+            if any(ext in link for ext in IMAGE_EXTENSIONS):
                 self.img_links.append(link)
         self.img_links = sorted(self.remove_duplicates(self.img_links))
 
     def scrape_regex(self) -> list[str]:
         """Use regex to scrape page source for `http` and `https` urls."""
-        pattern = r"https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b(?:[-a-zA-Z0-9@:%_\+.~#?&//=]*)"
-        matches = re.findall(pattern, html.unescape(self.source))
+        source = self.source
+        if self.skip_code:
+            with stage("links", "remove_code", len(source)):
+                source = remove_code(source)
+        pattern = get_pattern("url")
+        if not is_default_pattern("url"):
+            with stage("links", "unescape", len(source)):
+                source = html.unescape(source)
+            windows = [source]
+        else:
+            # Only unescape the runs of url characters that start with 'http'
+            with stage("links", "unescape", len(source)):
+                windows = [
+                    html.unescape(window) for window in LINK_WINDOW.findall(source)
+                ]
+        with stage("links", "regex", sum(len(window) for window in windows)) as timer:
+            matches = [match for window in windows for match in pattern.findall(window)]
+            timer.accepted = len(matches)
         return matches
 
     def get_links(
         self,
         link_type: str = "all",
         same_site_only: bool = False,
-        excluded_links: list[str] | None = None,
+        excluded_links: Iterable[str] | None = None,
     ) -> list[str]:
         """Returns a list of urls found on the page.
 
@@ -146,7 +322,7 @@ class LinkScraper:
 
         :param same_site_only: Excludes external urls if True.
 
-        :param excluded_links: A list of urls to filter out of the results.
+        :param excluded_links: Urls to filter out of the results, ideally a set.
         Useful for excluding duplicates when recursively scraping a website.
         Can also be used with link_type='all' to get two link types in one call:
 
@@ -154,8 +330,8 @@ class LinkScraper:
         will return page links and img links."""
         match link_type:
             case "all":
-                links = self.remove_duplicates(
-                    self.page_links + self.img_links + self.script_links
+                links = sorted(
+                    set(self.page_links + self.img_links + self.script_links)
                 )
             case "page":
                 links = self.page_links
@@ -168,5 +344,8 @@ class LinkScraper:
         if same_site_only:
             links = self.filter_same_site(links)
         if excluded_links:
+            if not isinstance(excluded_links, (set, frozenset)):
+                excluded_links = set(excluded_links)
             links = [link for link in links if link not in excluded_links]
-        return sorted(links)
+        # The individual link lists are already sorted
+        return list(links)
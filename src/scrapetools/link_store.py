@@ -0,0 +1,129 @@
+import sys
+from typing import Iterable, Iterator
+
+from .link_scraper import LINK_TYPES, LinkScraper
+
+# Bit flags for each link type
+PAGE = 1
+IMG = 2
+SCRIPT = 4
+TYPE_FLAGS = {"page": PAGE, "img": IMG, "script": SCRIPT}
+ALL = PAGE | IMG | SCRIPT
+
+
+def split_prefix(link: str) -> tuple[str, str]:
+    """Splits `link` into its 'scheme://netloc' prefix and the rest of the url.
+
+    Links without a netloc have an empty prefix."""
+    start = link.find("://")
+    if start == -1:
+        return "", link
+    start += 3
+    stop = len(link)
+    for ch in "/?#":
+        index = link.find(ch, start)
+        if index != -1 and index < stop:
+            stop = index
+    return link[:stop], link[stop:]
+
+
+class LinkStore:
+    """Compact, deduplicated storage for the links of many pages.
+
+    Each 'scheme://netloc' prefix is stored once and links are kept as
+    the remainder of the url under their prefix.
+    Instead of copying a link between lists for each link type,
+    it's stored once with a bit mask of its types (`PAGE`, `IMG`, `SCRIPT`).
+
+    >>> store = LinkStore()
+    >>> for source, url in pages:
+    ...     scraper = LinkScraper(source, url)
+    ...     scraper.scrape_page(release=True)
+    ...     store.add_scraper(scraper)
+    >>> store.get_links("img")"""
+
+    def __init__(self):
+        self.prefixes: list[str] = []
+        self.prefix_ids: dict[str, int] = {}
+        # Per prefix id, rest of url -> link type flags
+        self.paths: list[dict[str, int]] = []
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __contains__(self, link: str) -> bool:
+        return self.get_type(link) != 0
+
+    def __iter__(self) -> Iterator[str]:
+        for prefix, paths in zip(self.prefixes, self.paths):
+            for path in paths:
+                yield prefix + path
+
+    def get_type(self, link: str) -> int:
+        """Returns the link type flags for `link` or 0 if it isn't stored."""
+        prefix, path = split_prefix(link)
+        prefix_id = self.prefix_ids.get(prefix)
+        if prefix_id is None:
+            return 0
+        return self.paths[prefix_id].get(path, 0)
+
+    def add(self, link: str, link_type: str = "page") -> bool:
+        """Add `link` as `link_type`.
+
+        Returns True if the link wasn't stored before.
+
+        :param link_type: Can be 'page', 'img', or 'script'."""
+        flag = TYPE_FLAGS[link_type]
+        prefix, path = split_prefix(link)
+        prefix_id = self.prefix_ids.get(prefix)
+        if prefix_id is None:
+            prefix_id = len(self.prefixes)
+            self.prefixes.append(sys.intern(prefix))
+            self.prefix_ids[self.prefixes[-1]] = prefix_id
+            self.paths.append({})
+        paths = self.paths[prefix_id]
+        flags = paths.get(path, 0)
+        paths[path] = flags | flag
+        if not flags:
+            self.size += 1
+            return True
+        return False
+
+    def update(self, links: Iterable[str], link_type: str = "page") -> int:
+        """Add every link in `links` as `link_type`.
+
+        Returns the number of links that weren't stored before."""
+        return sum(self.add(link, link_type) for link in links)
+
+    def add_scraper(self, scraper: LinkScraper) -> int:
+        """Add the page, img, and script links of a scraper
+        that has already scraped its page.
+
+        Returns the number of links that weren't stored before."""
+        return sum(
+            self.update(getattr(scraper, f"{link_type}_links"), link_type)
+            for link_type in LINK_TYPES
+        )
+
+    def get_links(self, link_type: str = "all", host: str | None = None) -> list[str]:
+        """Returns a sorted list of stored urls.
+
+        :param link_type: Can be 'all', 'page', 'img', or 'script'.
+
+        :param host: Only return links whose netloc is `host`,
+        ignoring a leading 'www.'."""
+        flag = ALL if link_type == "all" else TYPE_FLAGS[link_type]
+        links: list[str] = []
+        for prefix, paths in zip(self.prefixes, self.paths):
+            if host is not None and (
+                prefix.partition("://")[2].removeprefix("www.")
+                != host.removeprefix("www.")
+            ):
+                continue
+            links.extend(prefix + path for path, flags in paths.items() if flags & flag)
+        return sorted(links)
+
+    def hosts(self) -> list[str]:
+        """Returns the sorted 'scheme://netloc' prefixes of the stored links."""
+        return sorted(prefix for prefix in self.prefixes if prefix)
@@ -0,0 +1,215 @@
+from typing import Any, Iterable
+
+from bs4 import BeautifulSoup
+from bs4.element import Tag
+
+from .backends import make_soup, validate_backend
+from .email_scraper import scrape_emails
+from .input_scraper import InputCollector, InputRecord
+from .instrumentation import stage
+from .link_scraper import LinkScraper
+from .phone_scraper import scrape_phone_numbers
+
+EXTRACTORS = ("links", "emails", "phones", "inputs")
+
+
+class ScrapedPage:
+    """Everything extracted from a single page.
+
+    Link lists are sorted and deduplicated the same way as `LinkScraper`.
+
+    Input element lists hold BeautifulSoup Tag elements, matching `scrape_inputs`,
+    or `InputRecord`s if the page was extracted with `structured_inputs`.
+
+    Fields for extractors that weren't run are left empty."""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.page_links: list[str] = []
+        self.img_links: list[str] = []
+        self.script_links: list[str] = []
+        self.emails: list[str] = []
+        self.phone_numbers: list[str] = []
+        self.forms: list[Tag | InputRecord] = []
+        self.inputs: list[Tag | InputRecord] = []
+        self.buttons: list[Tag | InputRecord] = []
+        self.selects: list[Tag | InputRecord] = []
+        self.text_areas: list[Tag | InputRecord] = []
+
+    def __repr__(self) -> str:
+        return (
+            f"ScrapedPage(url={self.url!r}, page_links={len(self.page_links)}, "
+            f"img_links={len(self.img_links)}, script_links={len(self.script_links)}, "
+            f"emails={len(self.emails)}, phone_numbers={len(self.phone_numbers)}, "
+            f"forms={len(self.forms)})"
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Returns the results as plain, picklable and json serializable data.
+
+        Input Tag elements are converted to their html strings
+        and `InputRecord`s to dictionaries."""
+        return {
+            "url": self.url,
+            "page_links": self.page_links,
+            "img_links": self.img_links,
+            "script_links": self.script_links,
+            "emails": self.emails,
+            "phone_numbers": self.phone_numbers,
+            "forms": [to_data(tag) for tag in self.forms],
+            "inputs": [to_data(tag) for tag in self.inputs],
+            "buttons": [to_data(tag) for tag in self.buttons],
+            "selects": [to_data(tag) for tag in self.selects],
+            "text_areas": [to_data(tag) for tag in self.text_areas],
+        }
+
+
+def to_data(element: Tag | InputRecord) -> str | dict[str, Any]:
+    """Returns an input element as its html string or an input record as a dictionary."""
+    if isinstance(element, InputRecord):
+        return element.to_dict()
+    return str(element)
+
+
+def validate_extractors(extractors: Iterable[str]):
+    """Raise a ValueError if any of `extractors` isn't one of `EXTRACTORS`."""
+    for extractor in extractors:
+        if extractor not in EXTRACTORS:
+            raise ValueError(
+                f"Unknown extractor {extractor!r}, must be one of {EXTRACTORS}."
+            )
+
+
+class Visitor:
+    """Base class for an extractor that runs over the shared document traversal.
+
+    `visit()` is called once for every tag in document order
+    and `finish()` is called once after the traversal to store the results."""
+
+    def visit(self, tag: Tag):
+        pass
+
+    def finish(self, page: ScrapedPage):
+        pass
+
+
+class LinkVisitor(Visitor):
+    """Collects page, img, and script links according to the scraper's rules."""
+
+    def __init__(self, scraper: LinkScraper):
+        self.scraper = scraper
+
+    def visit(self, tag: Tag):
+        self.scraper.collect(tag.name, tag.attrs)
+
+    def finish(self, page: ScrapedPage):
+        scraper = self.scraper
+        # Every tag has already been visited, don't traverse again
+        scraper.collected = True
+        scraper.scrape_page()
+        page.page_links = scraper.page_links
+        page.img_links = scraper.img_links
+        page.script_links = scraper.script_links
+
+
+class InputVisitor(Visitor):
+    """Collects forms and the input elements that aren't inside a form."""
+
+    def __init__(self, structured: bool = False):
+        self.collector = InputCollector(structured)
+
+    def visit(self, tag: Tag):
+        self.collector.visit(tag)
+
+    def finish(self, page: ScrapedPage):
+        (
+            page.forms,
+            page.inputs,
+            page.buttons,
+            page.selects,
+            page.text_areas,
+        ) = self.collector.results()
+
+
+class PageExtractor:
+    """Runs several extractors over a page while only parsing it once.
+
+    >>> page = PageExtractor(source, url).extract()
+    >>> page.emails, page.page_links, page.forms
+
+    :param extractors: Which of 'links', 'emails', 'phones', and 'inputs' to run.
+    Defaults to all of them.
+
+    :param backend: The tree building parser to use, either 'html.parser' or 'lxml'.
+
+    :param structured_inputs: Collect input elements as `InputRecord`s instead of Tags."""
+
+    def __init__(
+        self,
+        html_src: str,
+        page_url: str,
+        extractors: Iterable[str] = EXTRACTORS,
+        backend: str = "html.parser",
+        structured_inputs: bool = False,
+    ):
+        validate_backend(backend, tree=True)
+        self.source = html_src
+        self.page_url = page_url
+        self.backend = backend
+        self.structured_inputs = structured_inputs
+        self.extractors = list(extractors)
+        validate_extractors(self.extractors)
+
+    def get_visitors(self, soup: BeautifulSoup) -> list[Visitor]:
+        """Returns a visitor for each requested extractor that needs the tree."""
+        visitors: list[Visitor] = []
+        if "links" in self.extractors:
+            scraper = LinkScraper(
+                self.source, self.page_url, soup=soup, backend=self.backend
+            )
+            visitors.append(LinkVisitor(scraper))
+        if "inputs" in self.extractors:
+            visitors.append(InputVisitor(self.structured_inputs))
+        return visitors
+
+    def extract(self) -> ScrapedPage:
+        """Parse the page once and return the results of every requested extractor."""
+        page = ScrapedPage(self.page_url)
+        # Emails and phone numbers are scraped from the raw text, not the tree
+        if "emails" in self.extractors:
+            page.emails = scrape_emails(self.source)
+        if "phones" in self.extractors:
+            page.phone_numbers = scrape_phone_numbers(self.source)
+        if "links" in self.extractors or "inputs" in self.extractors:
+            with stage("page", "parse", len(self.source)):
+                soup = make_soup(self.source, self.backend)
+            visitors = self.get_visitors(soup)
+            with stage("page", "traverse", len(self.source)):
+                for element in soup.descendants:
+                    if isinstance(element, Tag):
+                        for visitor in visitors:
+                            visitor.visit(element)
+            for visitor in visitors:
+                visitor.finish(page)
+        return page
+
+
+def scrape_page(
+    html_src: str,
+    page_url: str,
+    extractors: Iterable[str] = EXTRACTORS,
+    backend: str = "html.parser",
+    structured_inputs: bool = False,
+) -> ScrapedPage:
+    """Extract links, emails, phone numbers, and user inputs from a page
+    with a single parse of its source.
+
+    :param extractors: Which of 'links', 'emails', 'phones', and 'inputs' to run.
+    Defaults to all of them.
+
+    :param backend: The tree building parser to use, either 'html.parser' or 'lxml'.
+
+    :param structured_inputs: Collect input elements as `InputRecord`s instead of Tags."""
+    return PageExtractor(
+        html_src, page_url, extractors, backend, structured_inputs
+    ).extract()
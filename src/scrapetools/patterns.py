@@ -0,0 +1,188 @@
+"""Compiled regular expressions and lookup tables shared by the scrapers.
+
+Patterns are compiled once, at import or on first use of a configuration,
+instead of on every call. Relying on the `re` module's internal cache
+isn't enough since other code in the process can evict from it."""
+
+import re
+from functools import lru_cache
+from string import printable
+from typing import Any
+
+# Starts with an alphanumeric character.
+# Local part consists of 1-63 alphanumeric + '._-' characters.
+# Contains a single '@' character not at the beginning or end of a string.
+# Domain consists of one or more alphanumeric + '_-' characters
+# followed by a '.' and one or more alphanumeric + '._-' characters
+# and ending in an alphabetical character.
+EMAIL_REGEX = (
+    r"[a-zA-Z0-9]{1}[a-zA-Z0-9._-]{1,63}@[a-zA-Z0-9_-]+\.[a-zA-Z0-9._-]+[a-zA-Z]{1}"
+)
+PHONE_REGEX = r"\b\(?[2-9]{1}[0-9]{2}\)?[ .-]{1}[2-9]{1}[0-9]{2}[ .-]{1}[0-9]{4}\b"
+URL_REGEX = r"https?://(?:www\.)?[-a-zA-Z0-9@:%._\+~#=]{2,256}\.[a-z]{2,6}\b(?:[-a-zA-Z0-9@:%_\+.~#?&//=]*)"
+# Phone numbers in any country's format, used by `scrape_phone_numbers(regions=...)`.
+# An optional international prefix ('+' or '00' and one of the country codes
+# being searched for, filled in with `str.format()`) or a '+' and any other country code,
+# then an optional area code in parentheses and groups of digits
+# separated by single spaces, dots, or dashes.
+REGION_PHONE_REGEX = (
+    r"(?<![\w+])(?:(?:\+|00)({country_codes})[ .-]?(?:\(0\)[ .-]?)?|(\+))?"
+    r"((?:\(\d{{1,5}}\)[ .-]?)?\d{{1,15}}(?:[ .-]\d{{1,15}}){{0,6}})(?!\w)"
+)
+UNICODE_HEX_REGEX = r"u00[a-zA-Z0-9]{2}"
+NON_DIGIT_REGEX = r"[^0-9]"
+# Contents of script and style elements and data uris,
+# which can be skipped with the scrapers' `skip_code` option.
+# An element that's never closed runs to the end of the text.
+CODE_REGEX = r"(?is)<(script|style)\b.*?(?:</\1\s*>|\Z)|data:[^\s\"')>]+"
+
+# File extensions that show up where an email's top level domain should be.
+FILE_EXTENSIONS = (
+    "png",
+    "jpg",
+    "js",
+    "html",
+    "svg",
+    "jpeg",
+    "mp4",
+    "mpeg",
+    "css",
+    "pdf",
+    "wav",
+    "docx",
+    "txt",
+    "rtf",
+    "gif",
+    "webp",
+    "x",
+)
+# Top level domains that don't need to be checked for file extensions.
+COMMON_TLDS = frozenset(["com", "org", "net", "us", "io", "edu", "gov", "biz"])
+# Unicode hex strings that get picked up at the front of emails.
+UNICODE_PREFIXES = ("u003e", "u00a0")
+# Technically some of these characters are valid in an email string,
+# but the ratio of how often they're used to how often they produce
+# false positives makes them worth disregarding.
+INVALID_EMAIL_CHARACTERS = frozenset(" <>[]{},\"':;\\/#$%^&*()=+`?|\n\t\r")
+VALID_EMAIL_CHARACTERS = frozenset(printable) - INVALID_EMAIL_CHARACTERS
+
+# Links containing one of these are also treated as image links.
+IMAGE_EXTENSIONS = (
+    ".jpg",
+    ".jpeg",
+    ".png",
+    ".svg",
+    ".bmp",
+    ".tiff",
+    ".eps",
+    ".gif",
+    ".jfif",
+    ".webp",
+    ".heif",
+    ".avif",
+    ".bat",
+    ".bpg",
+)
+
+# North American area codes that can be assigned.
+# Area codes can't start with 0 or 1, have 9 as their middle digit (reserved for expansion),
+# or end in 11 (used for service codes).
+NANP_AREA_CODES = frozenset(
+    str(code) for code in range(200, 1000) if code // 10 % 10 != 9 and code % 100 != 11
+)
+
+DEFAULT_PATTERNS = {
+    "email": EMAIL_REGEX,
+    "phone": PHONE_REGEX,
+    "url": URL_REGEX,
+    "unicode_hex": UNICODE_HEX_REGEX,
+    "non_digit": NON_DIGIT_REGEX,
+    "code": CODE_REGEX,
+}
+patterns: dict[str, re.Pattern[str]] = {}
+
+
+def register_pattern(name: str, pattern: str | re.Pattern[str], flags: int = 0):
+    """Compile `pattern` and make it available as `get_pattern(name)`.
+
+    Registering a name that already exists replaces that pattern
+    for every scraper that uses it, e.g.
+
+    >>> register_pattern("phone", r"\\b[0-9]{3}-[0-9]{3}-[0-9]{4}\\b")"""
+    if isinstance(pattern, str):
+        pattern = re.compile(pattern, flags)
+    patterns[name] = pattern
+
+
+def get_pattern(name: str) -> re.Pattern[str]:
+    """Returns the compiled pattern registered as `name`."""
+    return patterns[name]
+
+
+def is_default_pattern(name: str) -> bool:
+    """Returns whether the pattern registered as `name` is the default one.
+
+    The scrapers' prefilters rely on the default patterns
+    and are skipped for customized ones."""
+    return patterns[name].pattern == DEFAULT_PATTERNS[name]
+
+
+def reset_patterns():
+    """Register the default patterns, replacing any customizations."""
+    for name, pattern in DEFAULT_PATTERNS.items():
+        register_pattern(name, pattern)
+
+
+reset_patterns()
+
+
+@lru_cache(maxsize=128)
+def compile_bytes_pattern(pattern: re.Pattern[str]) -> re.Pattern[bytes]:
+    return re.compile(pattern.pattern.encode("utf-8"), pattern.flags & ~re.UNICODE)
+
+
+def compile_for(pattern: re.Pattern[str], text: Any) -> re.Pattern[Any]:
+    """Returns `pattern`, compiled for bytes if `text` isn't a string."""
+    return pattern if isinstance(text, str) else compile_bytes_pattern(pattern)
+
+
+# Fixed patterns the prefilters use to find where the default patterns can match.
+# These work on bytes-like objects too, which don't all have `find()` and `split()`.
+AT_SIGN = re.compile(r"@")
+NON_WHITESPACE = re.compile(r"\S*")
+# Matches up to and including the last whitespace character before `endpos`.
+LAST_WHITESPACE = re.compile(r".*\s", re.DOTALL)
+# A '+1' country code directly in front of a number, e.g. '+12015550123'.
+COUNTRY_CODE = re.compile(r"\+1(?=[0-9])")
+# Every match of `PHONE_REGEX` ends with one of these and is at most 14 characters long.
+DIGIT_RUN = re.compile(r"[0-9]{4}")
+# Where a match of `REGION_PHONE_REGEX` can start.
+# A single character class lets `re` skip ahead to candidates quickly,
+# which the full pattern's leading lookbehind prevents.
+REGION_PHONE_START = re.compile(r"[+(0-9](?<![\w+].)")
+# Every match of `URL_REGEX` in html escaped text is inside one of these.
+LINK_WINDOW = re.compile(r"http[-a-zA-Z0-9@:%._+~#?&/=;]*")
+# The start of each match of `CODE_REGEX`, with the group that matched
+# giving the index of the pattern in `CODE_ENDS` that finds where it ends.
+# Data uris are matched in full.
+CODE_START = re.compile(r"(?i)<(?:(script)|(style))\b|data:[^\s\"')>]+")
+CODE_ENDS = (re.compile(r"(?i)</script\s*>"), re.compile(r"(?i)</style\s*>"))
+
+
+def get_bytes_pattern(name: str) -> re.Pattern[bytes]:
+    """Returns the pattern registered as `name` compiled for matching bytes-like objects.
+
+    In bytes patterns, word boundaries and classes like `\\s`
+    only treat ascii characters as word or whitespace characters."""
+    return compile_bytes_pattern(patterns[name])
+
+
+@lru_cache(maxsize=128)
+def get_file_extensions(extra_extensions: tuple[str, ...] = ()) -> frozenset[str]:
+    """Returns `FILE_EXTENSIONS` plus `extra_extensions` as a set
+    of lowercase extensions without leading dots.
+
+    Built once per distinct set of extra extensions."""
+    return frozenset(FILE_EXTENSIONS).union(
+        extension.strip(".").lower() for extension in extra_extensions
+    )
@@ -1,18 +1,287 @@
 import re
+from functools import lru_cache
+from typing import Any, Iterable, Iterator
 
 import phonenumbers
 
+from .cache import LRUCache
+from .instrumentation import stage
+from .patterns import (
+    COUNTRY_CODE,
+    DIGIT_RUN,
+    NANP_AREA_CODES,
+    REGION_PHONE_REGEX,
+    REGION_PHONE_START,
+    compile_for,
+    get_bytes_pattern,
+    get_pattern,
+    is_default_pattern,
+)
+from .prefilter import find_windows, remove_code
+from .streams import DEFAULT_CHUNK_SIZE, Buffer, Stream, iter_windows
+
+# Non-word characters that can't be part of a match,
+# so text can be split on them without changing what `scrape_phone_numbers` finds.
+PHONE_DELIMITERS = "\t\n\r\f\v<>\"',;:[]{}|\\/=`^*!?#&$~@%"
+
+# Results of `phonenumbers` validation for 10 digit numbers, shared by every call.
+# The same numbers tend to show up on every page of a site.
+# Use `validation_cache.stats()` to see hit rates and `validation_cache.save()`
+# and `validation_cache.load()` to persist it between processes.
+validation_cache = LRUCache(maxsize=100000)
+# 'region:national number' -> (E.164 formatted number or '' if it isn't valid, group ends).
+# Used when scraping with `regions`.
+region_cache = LRUCache(maxsize=100000)
+DIGITS = re.compile(r"[0-9]+")
+# Fewest digits, as written, in a number found with `regions`.
+# Shorter numbers exist, but on web pages these are almost always ids, prices, and years.
+MIN_DIGITS = 7
+
+
+def is_possible_nanp_number(number: str) -> bool:
+    """Cheap check that `number` is 10 digits with an area code that can be assigned.
+
+    Never rejects a number `phonenumbers` considers valid."""
+    return len(number) == 10 and number.isdigit() and number[:3] in NANP_AREA_CODES
+
+
+def is_valid_number(number: str) -> bool:
+    """Returns whether a 10 digit u.s. number is valid according to `phonenumbers`.
+
+    Obvious non-numbers are rejected without calling `phonenumbers`
+    and results are cached in `validation_cache`."""
+    if not is_possible_nanp_number(number):
+        return False
+    valid = validation_cache.get(number)
+    if valid is None:
+        valid = phonenumbers.is_valid_number(phonenumbers.parse("+1" + number))
+        validation_cache.set(number, valid)
+    return valid
+
+
+class Region:
+    """What `scrape_phone_numbers` needs to know about a region
+    to rule out candidates without calling `phonenumbers`.
+
+    :param code: The two letter region code, like 'US' or 'GB'."""
+
+    __slots__ = ("code", "country_code", "national_prefix", "lengths", "pattern")
+
+    def __init__(self, code: str):
+        metadata = phonenumbers.PhoneMetadata.metadata_for_region(code.upper())
+        if metadata is None:
+            raise ValueError(f"Unknown region {code!r}.")
+        self.code = code.upper()
+        self.country_code = str(metadata.country_code)
+        self.national_prefix = metadata.national_prefix or ""
+        # National number lengths. Lengths only possible when dialing
+        # without an area code aren't included since those numbers can't be valid.
+        self.lengths = frozenset(metadata.general_desc.possible_length)
+        # Every valid national number of the region matches this
+        self.pattern = re.compile(metadata.general_desc.national_number_pattern)
+
+    def get_nationals(self, digits: str) -> list[str]:
+        """Returns the national numbers `digits` could be, with and without
+        the region's national prefix, that pass the region's length and pattern checks.
+
+        The prefix is also tried after a country code since numbers like
+        '+44 020 7946 0958' are a common way of writing '+44 20 7946 0958'."""
+        nationals = [digits]
+        if self.national_prefix and digits.startswith(self.national_prefix):
+            nationals.append(digits[len(self.national_prefix) :])
+        return [
+            national
+            for national in nationals
+            if len(national) in self.lengths and self.pattern.fullmatch(national)
+        ]
+
+    def format_valid_number(self, national: str) -> tuple[str, list[int]]:
+        """Returns `national` in E.164 format if it's a valid number in this region,
+        according to `phonenumbers`, or an empty string if it isn't.
+
+        Also returns where the digit groups of the number's national format end,
+        counted in digits from the end of the number, see `get_group_ends()`.
+
+        Results are cached in `region_cache`."""
+        key = f"{self.code}:{national}"
+        result = region_cache.get(key)
+        if result is None:
+            result = ("", [])
+            # The national prefix has already been handled by `get_nationals()`,
+            # so the number can be built directly instead of calling `phonenumbers.parse()`.
+            parsed = phonenumbers.PhoneNumber(
+                country_code=int(self.country_code), national_number=int(national)
+            )
+            zeros = len(national) - len(national.lstrip("0"))
+            if zeros:
+                parsed.italian_leading_zero = True
+                if zeros > 1:
+                    parsed.number_of_leading_zeros = zeros
+            if phonenumbers.is_valid_number_for_region(parsed, self.code):
+                result = (
+                    phonenumbers.format_number(
+                        parsed, phonenumbers.PhoneNumberFormat.E164
+                    ),
+                    get_group_ends(
+                        DIGITS.findall(
+                            phonenumbers.format_number(
+                                parsed, phonenumbers.PhoneNumberFormat.NATIONAL
+                            )
+                        )
+                    ),
+                )
+            region_cache.set(key, result)
+        return result[0], result[1]
+
+
+def get_group_ends(groups: list[str]) -> list[int]:
+    """Returns where each group of digits but the last ends,
+    counted in digits from the end of the last group.
+
+    Counting from the end lines up the groups of numbers
+    written with and without prefixes."""
+    ends: list[int] = []
+    size = 0
+    for group in reversed(groups[1:]):
+        size += len(group)
+        ends.append(size)
+    return ends
+
+
+@lru_cache(maxsize=None)
+def get_region(code: str) -> Region:
+    return Region(code)
+
+
+@lru_cache(maxsize=128)
+def get_region_pattern(country_codes: frozenset[str]) -> re.Pattern[str]:
+    """Returns `REGION_PHONE_REGEX` compiled for `country_codes`."""
+    return re.compile(
+        REGION_PHONE_REGEX.format(
+            country_codes="|".join(sorted(country_codes, key=len, reverse=True))
+        )
+    )
+
+
+def find_region_number(groups: list[str], regions: tuple[Region, ...]) -> str | None:
+    """Returns the first valid number, in E.164 format,
+    that the digit `groups` are in one of `regions`, if any."""
+    digits = "".join(groups)
+    if len(digits) < MIN_DIGITS:
+        return None
+    group_ends = get_group_ends(groups)
+    for region in regions:
+        for national in region.get_nationals(digits):
+            number, number_group_ends = region.format_valid_number(national)
+            # Groups that don't line up with the number's own formatting,
+            # like a date followed by other digits, aren't phone numbers.
+            # Groups before the start of the number, like a national prefix, are fine.
+            if number and all(
+                end in number_group_ends for end in group_ends if end < len(national)
+            ):
+                return number
+    return None
+
+
+def find_region_numbers(
+    body: str, country_code: str, regions: tuple[Region, ...]
+) -> list[str]:
+    """Returns the valid numbers, in E.164 format, in a candidate from `scrape_region_numbers()`.
+
+    The pattern can run a phone number into the digits around it,
+    so the longest runs of digit groups that are valid numbers are taken from the front,
+    skipping groups that don't start one.
+
+    :param country_code: The country code `body` was prefixed with, or an empty string."""
+    if country_code:
+        international_regions = tuple(
+            region for region in regions if region.country_code == country_code
+        )
+    groups = DIGITS.findall(body)
+    numbers: list[str] = []
+    start = 0
+    while start < len(groups):
+        # Only the first number follows the country code
+        international = bool(country_code) and start == 0
+        for stop in range(len(groups), start, -1):
+            number = find_region_number(
+                groups[start:stop],
+                international_regions if international else regions,
+            )
+            if number:
+                numbers.append(number)
+                start = stop
+                break
+        else:
+            start += 1
+    return numbers
+
+
+def iter_region_candidates(
+    text: str, pattern: re.Pattern[str]
+) -> Iterator[tuple[str, str]]:
+    """Yields (country code or '', digit groups) for each match of the region `pattern`
+    that doesn't have a country code other than the ones being searched for."""
+    end = 0
+    match_at = pattern.match
+    for start in REGION_PHONE_START.finditer(text):
+        position = start.start()
+        if position < end:
+            continue
+        match = match_at(text, position)
+        if match:
+            end = match.end()
+            country_code, foreign, body = match.groups()
+            if not foreign:
+                yield country_code or "", body
+
+
+def scrape_region_numbers(text: str, regions: Iterable[str]) -> list[str]:
+    """Scrape phone numbers written in the formats of `regions`
+    and return them in E.164 format.
+
+    Numbers without a country code are matched to the first region,
+    in the order given, that they're valid in."""
+    specs = tuple(get_region(code.upper()) for code in regions)
+    pattern = get_region_pattern(frozenset(spec.country_code for spec in specs))
+    with stage("phones", "regex", len(text)) as timer:
+        candidates = set(iter_region_candidates(text, pattern))
+        timer.candidates = len(candidates)
+    with stage("phones", "validate") as timer:
+        numbers = set(
+            number
+            for country_code, body in candidates
+            for number in find_region_numbers(body, country_code, specs)
+        )
+        timer.candidates = len(candidates)
+        timer.accepted = len(numbers)
+    return sorted(numbers)
+
+
+def count_consecutive_numbers(text: str, start: int, stop: int, limit: int = 10) -> int:
+    """Counts consecutive numeric characters in `text` starting at index `start`
+    and moving towards, but not including, `stop`.
+
+    Scans backwards if `stop` is less than `start`.
+
+    Stops counting at `limit` characters."""
+    step = 1 if stop >= start else -1
+    stop = start + step * min(abs(stop - start), limit)
+    count = 0
+    for i in range(start, stop, step):
+        if not text[i].isnumeric():
+            break
+        count += 1
+    return count
+
 
 def get_num_consecutive_numbers(text: str, reverse: bool = False) -> int:
-    """Finds the number of consecutive numeric characters in a string."""
-    # limit search to 10 characters
-    text[:10]
+    """Finds the number of consecutive numeric characters in a string.
+
+    The search is limited to 10 characters."""
     if reverse:
-        text = text[::-1]
-    for i, ch in enumerate(text):
-        if not ch.isnumeric():
-            return i
-    return len(text)
+        return count_consecutive_numbers(text, len(text) - 1, -1)
+    return count_consecutive_numbers(text, 0, len(text))
 
 
 def find_by_separator(text: str, separator: str) -> list[str]:
@@ -27,56 +296,55 @@ def find_by_separator(text: str, separator: str) -> list[str]:
     (xxx){separator}xxx{separator}xxxx
 
     xxx{separator}xxx{separator}xxxx"""
-    count = text.count(separator)
     numbers: list[str] = []
-    if count > 0:
-        last_stopdex = 0
-        for _ in range(count):
-            number = ""
-            sepdex = text.find(separator, last_stopdex)
-            if sepdex != -1:
-                next_sepdex = text.find(separator, sepdex + 1)
-                # consecutive numbers preceding sepdex
-                start_offset = get_num_consecutive_numbers(
-                    text[last_stopdex:sepdex], reverse=True
-                )
-                # consecutive numbers between sepdex and next_sepdex
-                first_stop_offset = get_num_consecutive_numbers(
-                    text[sepdex + 1 : next_sepdex + 1]
-                )
-                # consecutive numbers after next_sepdex
-                second_stop_offset = get_num_consecutive_numbers(
-                    text[next_sepdex + 1 :]
-                )
+    last_stopdex = 0
+    # Stop at the last separator instead of searching to the end of `text`
+    # again for every remaining separator skipped over by `last_stopdex`.
+    while (sepdex := text.find(separator, last_stopdex)) != -1:
+        number = ""
+        next_sepdex = text.find(separator, sepdex + 1)
+        # Counting with indices instead of slices keeps this linear.
+        # consecutive numbers preceding sepdex
+        start_offset = count_consecutive_numbers(
+            text, sepdex - 1, last_stopdex - 1
+        )
+        # consecutive numbers between sepdex and next_sepdex
+        first_stop_offset = count_consecutive_numbers(
+            text, sepdex + 1, max(next_sepdex + 1, sepdex + 1)
+        )
+        # consecutive numbers after next_sepdex
+        second_stop_offset = count_consecutive_numbers(
+            text, next_sepdex + 1, len(text)
+        )
 
-                if (
-                    start_offset == 3
-                    and first_stop_offset == 3
-                    and second_stop_offset == 4
-                ):
-                    # xxx{separator}xxx{separator}xxxx
-                    number = text[
-                        sepdex - start_offset : next_sepdex + second_stop_offset + 1
-                    ]
-                elif (
-                    start_offset == 0
-                    and first_stop_offset == 3
-                    and second_stop_offset == 4
-                    and text[sepdex - 1] == ")"
-                    and text[sepdex - 5] == "("
-                ):
-                    # (xxx){separator}xxx{separator}xxxx
-                    number = text[
-                        sepdex - 5 : sepdex + first_stop_offset + second_stop_offset + 2
-                    ]
-                elif start_offset == 3 and text[sepdex - 4] in [")", " "]:
-                    # (xxx)xxx{separator}xxxx or (xxx) xxx{separator}xxxx
-                    number = text[sepdex - 8 : sepdex + 5]
-                last_stopdex = sepdex + 5
-                for ch in [separator, "(", ")", " "]:
-                    number = number.replace(ch, "")
-                if len(number) == 10 and all(ch.isnumeric() for ch in number):
-                    numbers.append(number)
+        if (
+            start_offset == 3
+            and first_stop_offset == 3
+            and second_stop_offset == 4
+        ):
+            # xxx{separator}xxx{separator}xxxx
+            number = text[
+                sepdex - start_offset : next_sepdex + second_stop_offset + 1
+            ]
+        elif (
+            start_offset == 0
+            and first_stop_offset == 3
+            and second_stop_offset == 4
+            and text[sepdex - 1] == ")"
+            and text[sepdex - 5] == "("
+        ):
+            # (xxx){separator}xxx{separator}xxxx
+            number = text[
+                sepdex - 5 : sepdex + first_stop_offset + second_stop_offset + 2
+            ]
+        elif start_offset == 3 and text[sepdex - 4] in [")", " "]:
+            # (xxx)xxx{separator}xxxx or (xxx) xxx{separator}xxxx
+            number = text[sepdex - 8 : sepdex + 5]
+        last_stopdex = sepdex + 5
+        for ch in [separator, "(", ")", " "]:
+            number = number.replace(ch, "")
+        if len(number) == 10 and all(ch.isnumeric() for ch in number):
+            numbers.append(number)
     return numbers
 
 
@@ -103,26 +371,138 @@ def scrape_phone_numbers_noregex(text: str) -> list[str]:
     """Scrape for u.s. phone numbers."""
     numbers: list[str] = []
     text = text.replace("+1", "")
-    for separator in "-.":
-        numbers.extend(find_by_separator(text, separator))
-    numbers.extend(find_by_href(text))
-    numbers = [
-        number
-        for number in numbers
-        if phonenumbers.is_valid_number(phonenumbers.parse("+1" + number))
-    ]
-    numbers = sorted(list(set(numbers)))
+    with stage("phones_noregex", "scan", len(text)):
+        for separator in "-.":
+            numbers.extend(find_by_separator(text, separator))
+        numbers.extend(find_by_href(text))
+    candidates = set(numbers)
+    with stage("phones_noregex", "validate") as timer:
+        numbers = sorted(number for number in candidates if is_valid_number(number))
+        timer.candidates = len(candidates)
+        timer.accepted = len(numbers)
     return numbers
 
 
-def scrape_phone_numbers(text: str) -> list[str]:
-    """Scrape phone numbers from text using regex."""
-    text = text.replace("+1", " ")
-    pattern = r"\b\(?[2-9]{1}[0-9]{2}\)?[ .-]{1}[2-9]{1}[0-9]{2}[ .-]{1}[0-9]{4}\b"
-    numbers = [re.sub(r"[^0-9]", "", number) for number in re.findall(pattern, text)]
-    numbers = [
-        number
-        for number in numbers
-        if phonenumbers.is_valid_number(phonenumbers.parse("+1" + number))
-    ]
-    return sorted(set(numbers))
+def iter_matches(text: str | Buffer, pattern: re.Pattern[Any]) -> Iterator[re.Match]:
+    """Yields the matches of the phone `pattern` in `text`.
+
+    With the default pattern, only the text around runs of 4 digits is searched,
+    since every match ends with one."""
+    if not is_default_pattern("phone"):
+        yield from pattern.finditer(text)
+        return
+    # Searching with `pos` and `endpos` instead of slicing
+    # lets word boundaries see the characters around each window.
+    for start, stop in find_windows(text, DIGIT_RUN, before=10, after=1):
+        yield from pattern.finditer(text, start, stop)
+
+
+def find_candidates_in_bytes(buffer: Buffer, encoding: str = "utf-8") -> set[str]:
+    """Returns the digits of every match of the phone pattern in `buffer`,
+    the same as `scrape_phone_numbers` would find in the decoded text,
+    without decoding or copying `buffer`."""
+    pattern = get_pattern("phone")
+    non_digit = get_pattern("non_digit")
+    candidates: set[str] = set()
+    size = len(buffer)
+    for match in iter_matches(buffer, get_bytes_pattern("phone")):
+        start, end = match.span()
+        if (start > 0 and buffer[start - 1] > 127) or (
+            end < size and buffer[end] > 127
+        ):
+            # Word boundaries in bytes patterns don't know non-ascii letters
+            # are word characters, so match the decoded text around it instead
+            window = str(buffer[max(start - 4, 0) : end + 4], encoding, "ignore")
+            candidates.update(
+                non_digit.sub("", number) for number in pattern.findall(window)
+            )
+        else:
+            candidates.add(non_digit.sub("", match.group().decode("ascii", "replace")))
+    # The text path replaces '+1' with a space, which lets numbers
+    # written right after it, like '+12015550123', match.
+    # Those are rare enough to decode a few characters after each one.
+    for country_code in compile_for(COUNTRY_CODE, buffer).finditer(buffer):
+        end = country_code.end()
+        match = pattern.match(str(buffer[end : end + 32], encoding, "ignore"))
+        if match:
+            candidates.add(non_digit.sub("", match.group()))
+    return candidates
+
+
+def scrape_phone_numbers(
+    text: str | Buffer,
+    encoding: str = "utf-8",
+    skip_code: bool = False,
+    regions: Iterable[str] | None = None,
+) -> list[str]:
+    """Scrape phone numbers from text using regex.
+
+    :param text: The text to scrape. Can also be a bytes-like object or mmap,
+    which is scanned without decoding or copying it.
+
+    :param encoding: Used to decode `text` around '+1' country codes when `text`
+    isn't a string. Must be ascii compatible, like utf-8 or latin-1.
+
+    :param skip_code: Ignore the contents of script and style elements and data uris.
+
+    :param regions: Two letter region codes, like ['US', 'GB', 'DE'], to find numbers
+    written in the formats of those regions instead of just u.s. numbers.
+    Numbers are then returned in E.164 format, e.g. '+442079460958'.
+    Bytes-like objects are decoded first.
+    """
+    if regions is not None:
+        regions = tuple(regions)
+    if skip_code:
+        with stage("phones", "remove_code", len(text)):
+            text = remove_code(text)
+    if regions is not None:
+        if not isinstance(text, str):
+            text = str(text, encoding, "replace")
+        return scrape_region_numbers(text, regions)
+    with stage("phones", "regex", len(text)) as timer:
+        if isinstance(text, str):
+            text = text.replace("+1", " ")
+            non_digit = get_pattern("non_digit")
+            candidates = set(
+                non_digit.sub("", match.group())
+                for match in iter_matches(text, get_pattern("phone"))
+            )
+        else:
+            candidates = find_candidates_in_bytes(text, encoding)
+        timer.candidates = len(candidates)
+    with stage("phones", "validate") as timer:
+        numbers = sorted(number for number in candidates if is_valid_number(number))
+        timer.candidates = len(candidates)
+        timer.accepted = len(numbers)
+    return numbers
+
+
+def iter_phone_numbers(
+    stream: Stream,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    encoding: str = "utf-8",
+    regions: Iterable[str] | None = None,
+) -> Iterator[str]:
+    """Extract phone numbers from a stream of text without reading all of it into memory.
+
+    Yields each number once, as soon as the chunk containing it has been scanned.
+
+    :param stream: A string, bytes-like object, mmap,
+    text or binary file object, or an iterable of strings or bytes.
+
+    :param chunk_size: The approximate number of characters to scan at a time.
+
+    :param encoding: Used to decode bytes.
+
+    :param regions: Region codes to find numbers for, see `scrape_phone_numbers()`."""
+    # Every window is scraped with the same regions, even if given an iterator
+    if regions is not None:
+        regions = tuple(regions)
+    seen: set[str] = set()
+    for window in iter_windows(
+        stream, PHONE_DELIMITERS, chunk_size=chunk_size, encoding=encoding
+    ):
+        for number in scrape_phone_numbers(window, regions=regions):
+            if number not in seen:
+                seen.add(number)
+                yield number
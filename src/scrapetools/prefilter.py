@@ -0,0 +1,62 @@
+"""Cheap passes that find the parts of a page the scrapers' patterns can match,
+so the full patterns only run on small windows instead of the whole page."""
+
+import re
+from typing import Any
+
+from .patterns import (
+    CODE_ENDS,
+    CODE_START,
+    compile_for,
+    get_pattern,
+    is_default_pattern,
+)
+
+
+def remove_code(text: Any) -> Any:
+    """Returns `text` with the contents of script and style elements
+    and data uris replaced by newlines.
+
+    Elements are found by searching for their opening tag and then their closing tag,
+    so each part of `text` is only searched once, even when tags aren't closed.
+
+    :param text: A string or bytes-like object.
+    Bytes-like objects are returned as bytes."""
+    if not is_default_pattern("code"):
+        pattern = get_pattern("code")
+        if isinstance(text, str):
+            return pattern.sub("\n", text)
+        return compile_for(pattern, text).sub(b"\n", text)
+    start_pattern = compile_for(CODE_START, text)
+    kept: list[Any] = []
+    stop = 0
+    while match := start_pattern.search(text, stop):
+        kept.append(text[stop : match.start()])
+        stop = match.end()
+        if match.lastindex:
+            end = compile_for(CODE_ENDS[match.lastindex - 1], text).search(text, stop)
+            stop = end.end() if end else len(text)
+    kept.append(text[stop:])
+    return ("\n" if isinstance(text, str) else b"\n").join(kept)
+
+
+def find_windows(
+    text: Any, anchor: re.Pattern[str], before: int, after: int
+) -> list[tuple[int, int]]:
+    """Returns the (start, stop) index ranges of `text` that are within `before`
+    characters before or `after` characters after a match of `anchor`.
+
+    Overlapping ranges are merged, so a match spanning several anchors
+    is still inside a single range.
+
+    :param text: A string or bytes-like object."""
+    windows: list[tuple[int, int]] = []
+    size = len(text)
+    for match in compile_for(anchor, text).finditer(text):
+        start = max(match.start() - before, 0)
+        stop = min(match.end() + after, size)
+        if windows and start <= windows[-1][1]:
+            windows[-1] = (windows[-1][0], stop)
+        else:
+            windows.append((start, stop))
+    return windows
@@ -0,0 +1,195 @@
+"""Caching of scraper results keyed by a hash of the scraped content,
+so pages and boilerplate that repeat across a crawl are only scraped once.
+
+>>> cache = ResultCache()
+>>> for source, url in pages:
+...     emails = cache.scrape_emails(source)
+...     links = cache.scrape_links(source, url)
+>>> cache.stats()"""
+
+import hashlib
+import zlib
+from typing import Any, Iterable, Iterator
+
+from .cache import LRUCache, SqliteCache
+from .email_scraper import scrape_emails
+from .phone_scraper import scrape_phone_numbers
+from .prefilter import remove_code
+from .streams import Buffer
+
+# Average number of lines in a block when caching per block.
+# Blocks end after lines whose checksum is divisible by this.
+BLOCK_LINES = 64
+
+
+def content_hash(text: str | Buffer) -> str:
+    """Returns a 128 bit blake2b hex digest of `text`.
+
+    Strings are hashed as utf-8."""
+    if isinstance(text, str):
+        text = text.encode("utf-8", "surrogatepass")
+    return hashlib.blake2b(text, digest_size=16).hexdigest()
+
+
+def iter_blocks(text: str, max_size: int) -> Iterator[str]:
+    """Yield `text` in blocks of whole lines.
+
+    Where a block ends only depends on the lines in it, not their position in `text`,
+    so text repeated between pages splits into the same blocks
+    even when it's preceded by different content.
+    Blocks are also ended once they reach `max_size` characters."""
+    block: list[str] = []
+    size = 0
+    for line in text.splitlines(keepends=True):
+        block.append(line)
+        size += len(line)
+        checksum = zlib.crc32(line.encode("utf-8", "surrogatepass"))
+        if checksum % BLOCK_LINES == 0 or size >= max_size:
+            yield "".join(block)
+            block = []
+            size = 0
+    if block:
+        yield "".join(block)
+
+
+class ResultCache:
+    """Answers repeated `scrape_emails`, `scrape_phone_numbers`, and `LinkScraper` calls
+    on the same content with a lookup instead of scraping it again.
+
+    :param cache: Where results are stored, an `LRUCache` or a `SqliteCache`
+    to keep results between runs. Defaults to an `LRUCache` of 10000 entries.
+
+    :param block_size: If given, emails and phone numbers are cached per block of
+    about this many characters instead of per document, see `iter_blocks()`.
+    Documents that share boilerplate then only scrape the parts that differ.
+    Links are always cached per document and page url."""
+
+    def __init__(
+        self,
+        cache: LRUCache | SqliteCache | None = None,
+        block_size: int | None = None,
+    ):
+        self.cache = LRUCache(maxsize=10000) if cache is None else cache
+        self.block_size = block_size
+
+    def stats(self) -> dict[str, Any]:
+        """Returns the number of hits and misses, the hit rate,
+        and the current and maximum number of entries."""
+        return self.cache.stats()
+
+    def clear(self):
+        """Remove all cached results and reset the statistics."""
+        self.cache.clear()
+
+    def lookup(self, key: str, scrape: Any, *args: Any) -> Any:
+        """Returns a copy of the cached result for `key`, calling `scrape(*args)` on a miss.
+
+        Copies are returned so callers can modify results without changing the cache."""
+        result = self.cache.get(key)
+        if result is None:
+            result = scrape(*args)
+            self.cache.set(key, result)
+        return copy_result(result)
+
+    def scrape_blocks(
+        self, name: str, text: str | Buffer, scrape: Any, encoding: str
+    ) -> list[str]:
+        """Returns the sorted, combined results of `scrape()` for each block of `text`."""
+        if not isinstance(text, str):
+            text = str(text, encoding, "replace")
+        results: set[str] = set()
+        for block in iter_blocks(text, self.block_size or len(text)):
+            results.update(self.lookup(f"{name}:{content_hash(block)}", scrape, block))
+        return sorted(results)
+
+    def scrape_emails(
+        self,
+        text: str | Buffer,
+        extra_extensions: list[str] | None = None,
+        encoding: str = "utf-8",
+        skip_code: bool = False,
+    ) -> list[str]:
+        """Same as `email_scraper.scrape_emails()`, but cached."""
+        name = f"emails:{','.join(sorted(extra_extensions or ()))}"
+        if self.block_size is None:
+            return self.lookup(
+                f"{name}:{encoding}:{skip_code:d}:{content_hash(text)}",
+                scrape_emails,
+                text,
+                extra_extensions,
+                encoding,
+                skip_code,
+            )
+        if skip_code:
+            text = remove_code(text)
+        return self.scrape_blocks(
+            name,
+            text,
+            lambda block: scrape_emails(block, extra_extensions),
+            encoding,
+        )
+
+    def scrape_phone_numbers(
+        self,
+        text: str | Buffer,
+        encoding: str = "utf-8",
+        skip_code: bool = False,
+        regions: Iterable[str] | None = None,
+    ) -> list[str]:
+        """Same as `phone_scraper.scrape_phone_numbers()`, but cached."""
+        if regions is not None:
+            regions = [region.upper() for region in regions]
+        name = f"phones:{','.join(regions or ())}"
+        if self.block_size is None:
+            return self.lookup(
+                f"{name}:{encoding}:{skip_code:d}:{content_hash(text)}",
+                scrape_phone_numbers,
+                text,
+                encoding,
+                skip_code,
+                regions,
+            )
+        if skip_code:
+            text = remove_code(text)
+        return self.scrape_blocks(
+            name,
+            text,
+            lambda block: scrape_phone_numbers(block, regions=regions),
+            encoding,
+        )
+
+    def scrape_links(
+        self,
+        html_src: str,
+        page_url: str,
+        backend: str = "html.parser",
+        skip_code: bool = False,
+    ) -> dict[str, list[str]]:
+        """Returns the page, img, and script links `LinkScraper.scrape_page()` finds
+        in `html_src`, keyed by link type.
+
+        Relative links depend on the page url, so it's part of the cache key."""
+        key = f"links:{backend}:{skip_code:d}:{page_url}:{content_hash(html_src)}"
+        return self.lookup(key, scrape_links, html_src, page_url, backend, skip_code)
+
+
+def copy_result(result: list[str] | dict[str, list[str]]) -> Any:
+    """Returns a copy of a list of results or a dict of lists of results."""
+    if isinstance(result, dict):
+        return {name: list(values) for name, values in result.items()}
+    return list(result)
+
+
+def scrape_links(
+    html_src: str, page_url: str, backend: str, skip_code: bool
+) -> dict[str, list[str]]:
+    # Imported here so caching emails and phone numbers doesn't import bs4
+    from .link_scraper import LinkScraper
+
+    scraper = LinkScraper(html_src, page_url, backend=backend, skip_code=skip_code)
+    scraper.scrape_page()
+    return {
+        "page": scraper.page_links,
+        "img": scraper.img_links,
+        "script": scraper.script_links,
+    }
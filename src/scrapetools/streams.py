@@ -0,0 +1,78 @@
+import codecs
+import mmap
+from typing import IO, Iterable, Iterator
+
+Buffer = bytes | bytearray | memoryview | mmap.mmap
+Stream = str | Buffer | IO[str] | IO[bytes] | Iterable[str | bytes]
+
+# Number of characters read from a stream at a time.
+DEFAULT_CHUNK_SIZE = 1048576
+# Number of characters repeated between windows when one has to be cut
+# somewhere other than a delimiter.
+DEFAULT_OVERLAP = 512
+
+
+def iter_chunks(
+    stream: Stream, chunk_size: int = DEFAULT_CHUNK_SIZE, encoding: str = "utf-8"
+) -> Iterator[str]:
+    """Yield `stream` as text in pieces of about `chunk_size` characters.
+
+    `stream` can be a string, a bytes-like object (including an mmap),
+    a text or binary file object, or an iterable of strings or bytes.
+
+    Bytes are decoded incrementally with `encoding`,
+    undecodable bytes are replaced rather than raising an exception."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+
+    def decode(chunk: str | bytes) -> str:
+        return chunk if isinstance(chunk, str) else decoder.decode(chunk)
+
+    if isinstance(stream, str):
+        for i in range(0, len(stream), chunk_size):
+            yield stream[i : i + chunk_size]
+        return
+    if isinstance(stream, (bytes, bytearray, memoryview, mmap.mmap)):
+        # Slicing an mmap or bytes-like object only copies the slice
+        for i in range(0, len(stream), chunk_size):  # type: ignore
+            yield decode(stream[i : i + chunk_size])  # type: ignore
+    elif hasattr(stream, "read"):
+        while chunk := stream.read(chunk_size):  # type: ignore
+            yield decode(chunk)
+    else:
+        for chunk in stream:  # type: ignore
+            yield decode(chunk)
+    if tail := decoder.decode(b"", final=True):
+        yield tail
+
+
+def iter_windows(
+    stream: Stream,
+    delimiters: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    overlap: int = DEFAULT_OVERLAP,
+    encoding: str = "utf-8",
+) -> Iterator[str]:
+    """Yield `stream` as text in windows of about `chunk_size` characters
+    that end on one of `delimiters`.
+
+    As long as no match can contain or depend on a delimiter character,
+    scanning every window finds the same matches as scanning the whole text.
+
+    If there's no delimiter within four chunks of text,
+    the window is cut anyway and its last `overlap` characters
+    are repeated at the start of the next window.
+    Matches longer than `overlap` may be split in that case."""
+    buffer = ""
+    for chunk in iter_chunks(stream, chunk_size, encoding):
+        buffer += chunk
+        if len(buffer) < chunk_size:
+            continue
+        cut = max(buffer.rfind(delimiter) for delimiter in delimiters) + 1
+        if cut > 0:
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+        elif len(buffer) >= 4 * chunk_size:
+            yield buffer
+            buffer = buffer[-overlap:]
+    if buffer:
+        yield buffer
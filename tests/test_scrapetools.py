@@ -0,0 +1,703 @@
+import gc
+import importlib.util
+import io
+import json
+import mmap
+import os
+import pickle
+import random
+import re
+import subprocess
+import sys
+import tracemalloc
+from urllib.parse import unquote
+
+import pytest
+
+import scrapetools
+from scrapetools import batch, prefilter
+from scrapetools.backends import BACKENDS, TREE_BACKENDS
+from scrapetools.cache import SqliteCache
+from scrapetools.crawler import make_dict_fetcher
+from scrapetools.email_scraper import (
+    find_last_valid_character_offset,
+    scrape_emails_noregex,
+    strip_unicode,
+    validate,
+)
+from scrapetools.link_scraper import normalize_link
+from scrapetools.patterns import get_pattern
+from scrapetools.phone_scraper import find_by_separator
+from scrapetools.prefilter import remove_code
+
+URL = "https://www.example.com/home"
+SOURCE = """<html><head>
+<link href="/style.css"><script src="/js/app.js"></script>
+<script>var u = "https://cdn.example.org/lib.js"; var e = "sales@example.com";</script>
+</head><body>
+<a href="/about">About</a> <a href="#top">top</a> <a href="https://other.com/x/">x</a>
+<a href="/search?q=a&amp;b=c">search</a> <a href="tel:212-555-0123">call</a>
+Call (212) 555-0123 or 415.555.2671, mail john.doe@company.org
+<img src="/img/logo.png"><img data-src="pic.jpg"><div data-url="/d">d</div>
+<div href>q</div><source src="/v.mp4">
+<form id="f" action="/submit"><input name="q"><button>Go</button></form>
+<input name="outside" type="text"><select name="s"><option>1</option></select>
+<textarea name="notes"></textarea>
+</body></html>"""
+
+
+def with_optional(backends: tuple[str, ...]) -> list:
+    """Parameters for `backends` that skip the optional lxml parser if it's not installed."""
+    missing = importlib.util.find_spec("lxml") is None
+    skip_lxml = pytest.mark.skipif(missing, reason="lxml isn't installed")
+    return [
+        pytest.param(backend, marks=skip_lxml if backend == "lxml" else ())
+        for backend in backends
+    ]
+
+
+def scrape_links(backend: str) -> tuple[list[str], list[str], list[str]]:
+    scraper = scrapetools.LinkScraper(SOURCE, URL, backend=backend)
+    scraper.scrape_page()
+    return scraper.page_links, scraper.img_links, scraper.script_links
+
+
+@pytest.mark.parametrize("backend", with_optional(BACKENDS))
+def test_link_backend_parity(backend: str):
+    page_links, img_links, script_links = scrape_links(backend)
+    assert (page_links, img_links, script_links) == scrape_links("html.parser")
+    assert "https://www.example.com/about" in page_links
+    assert "https://www.example.com/search?q=a&b=c" in page_links
+    assert "https://www.example.com/img/logo.png" in img_links
+    assert script_links == ["https://www.example.com/js/app.js"]
+
+
+@pytest.mark.parametrize("backend", with_optional(TREE_BACKENDS))
+def test_input_backend_parity(backend: str):
+    expected = scrapetools.scrape_inputs(SOURCE)
+    results = scrapetools.scrape_inputs(SOURCE, backend=backend)
+    assert [[str(tag) for tag in tags] for tags in results] == [
+        [str(tag) for tag in tags] for tags in expected
+    ]
+    forms, inputs, buttons, selects, _ = results
+    assert len(forms) == 1 and len(inputs) == 1 and len(selects) == 1
+    assert buttons == []
+
+
+def test_structured_inputs():
+    forms, inputs, buttons, selects, text_areas = scrapetools.scrape_inputs(
+        SOURCE, structured=True
+    )
+    assert len(text_areas) == 1 and text_areas[0].name == "notes"
+    assert [(record.name, record.type) for record in inputs] == [("outside", "text")]
+    form = forms[0]
+    assert (form.form_id, form.form_action) == ("f", "/submit")
+    assert form.field_names == ["q", None]
+    assert [field.type for field in form.fields] == ["text", "submit"]
+    assert form.fields[0].form_action == "/submit"
+    assert pickle.loads(pickle.dumps(forms)) == forms
+    page = scrapetools.scrape_page(SOURCE, URL, structured_inputs=True)
+    assert page.forms == forms
+    assert page.to_dict()["forms"][0]["fields"][0]["attrs"] == {"name": "q"}
+
+
+def test_scrape_page_matches_individual_scrapers():
+    page = scrapetools.scrape_page(SOURCE, URL)
+    scraper = scrapetools.LinkScraper(SOURCE, URL)
+    scraper.scrape_page()
+    assert page.page_links == scraper.page_links
+    assert page.img_links == scraper.img_links
+    assert page.script_links == scraper.script_links
+    assert page.emails == scrapetools.scrape_emails(SOURCE)
+    assert page.phone_numbers == scrapetools.scrape_phone_numbers(SOURCE)
+    inputs = scrapetools.scrape_inputs(SOURCE)
+    assert [
+        [str(tag) for tag in tags]
+        for tags in (page.forms, page.inputs, page.buttons, page.selects, page.text_areas)
+    ] == [[str(tag) for tag in tags] for tags in inputs]
+
+    # A LinkScraper given the parsed tree doesn't parse the source again
+    reused = scrapetools.LinkScraper(SOURCE, URL, soup=scraper.soup)
+    reused.scrape_page()
+    assert reused.soup is scraper.soup
+    assert reused.get_links() == scraper.get_links()
+
+    page = scrapetools.scrape_page(SOURCE, URL, extractors=["emails"])
+    assert page.emails == scrapetools.scrape_emails(SOURCE)
+    assert page.page_links == page.phone_numbers == page.forms == []
+    with pytest.raises(ValueError):
+        scrapetools.scrape_page(SOURCE, URL, extractors=["emails", "fax"])
+
+
+@pytest.mark.parametrize("backend", with_optional(BACKENDS))
+def test_link_scraper_custom_rules(backend: str):
+    source = (
+        '<iframe src="/embed"></iframe>'
+        '<img srcset="/small.jpg 480w, /large.jpg 1080w" src="/img.jpg">'
+    )
+    scraper = scrapetools.LinkScraper(source, URL, backend=backend)
+    scraper.add_rule("iframe", "src")
+    scraper.add_rule("img", "srcset", "img")
+    scraper.scrape_page()
+    assert scraper.page_links == ["https://www.example.com/embed"]
+    assert scraper.img_links == [
+        "https://www.example.com/img.jpg",
+        "https://www.example.com/large.jpg",
+        "https://www.example.com/small.jpg",
+    ]
+
+
+def test_iter_emails_and_phone_numbers_match_across_chunks():
+    text = " filler <p>" * 500 + SOURCE + "<br>" * 500
+    emails = scrapetools.scrape_emails(text)
+    numbers = scrapetools.scrape_phone_numbers(text)
+    for chunk_size in [16, 100, 1000]:
+        assert sorted(scrapetools.iter_emails(text, chunk_size)) == emails
+        stream = io.BytesIO(text.encode())
+        assert sorted(scrapetools.iter_phone_numbers(stream, chunk_size)) == numbers
+
+
+def reference_find_by_separator(text: str, separator: str) -> list[str]:
+    """The slicing implementation `find_by_separator` replaced."""
+
+    def count_numbers(text: str) -> int:
+        for i, ch in enumerate(text):
+            if not ch.isnumeric():
+                return i
+        return len(text)
+
+    numbers: list[str] = []
+    last_stopdex = 0
+    for _ in range(text.count(separator)):
+        number = ""
+        sepdex = text.find(separator, last_stopdex)
+        if sepdex == -1:
+            continue
+        next_sepdex = text.find(separator, sepdex + 1)
+        start_offset = count_numbers(text[last_stopdex:sepdex][::-1])
+        first_stop_offset = count_numbers(text[sepdex + 1 : next_sepdex + 1])
+        second_stop_offset = count_numbers(text[next_sepdex + 1 :])
+        if start_offset == 3 and first_stop_offset == 3 and second_stop_offset == 4:
+            number = text[sepdex - start_offset : next_sepdex + second_stop_offset + 1]
+        elif (
+            start_offset == 0
+            and first_stop_offset == 3
+            and second_stop_offset == 4
+            and text[sepdex - 1] == ")"
+            and text[sepdex - 5] == "("
+        ):
+            number = text[
+                sepdex - 5 : sepdex + first_stop_offset + second_stop_offset + 2
+            ]
+        elif start_offset == 3 and text[sepdex - 4] in [")", " "]:
+            number = text[sepdex - 8 : sepdex + 5]
+        last_stopdex = sepdex + 5
+        for ch in [separator, "(", ")", " "]:
+            number = number.replace(ch, "")
+        if len(number) == 10 and all(ch.isnumeric() for ch in number):
+            numbers.append(number)
+    return numbers
+
+
+def reference_scrape_emails_noregex(text: str) -> list[str]:
+    """The slicing implementation `scrape_emails_noregex` replaced."""
+    if "%" in text:
+        text = unquote(text)
+    for ch in ["\n", "\t", "\r"]:
+        text = text.replace(ch, " ")
+    emails: list[str] = []
+    last_stopdex = 0
+    for _ in range(text.count("@")):
+        atdex = text.find("@", last_stopdex)
+        next_atdex = text.find("@", atdex + 1)
+        try:
+            chunk = text[last_stopdex:next_atdex] if next_atdex != -1 else text[last_stopdex:]
+            chunk_atdex = chunk.find("@")
+            startdex = find_last_valid_character_offset(chunk[: chunk_atdex + 1])
+            stopdex = find_last_valid_character_offset(chunk[chunk_atdex:])
+            email = chunk[chunk_atdex - startdex : stopdex + chunk_atdex + 1]
+            while email[-1].isnumeric() or not email[-1].isalpha():
+                email = email[:-1]
+            if validate(email):
+                emails.append(email.lower())
+            last_stopdex = atdex + len(email.split("@")[1]) + 1
+        except Exception:
+            last_stopdex = atdex + 1
+    return sorted(set(strip_unicode(emails)))
+
+
+def test_scanners_match_reference():
+    rng = random.Random(8)
+    alphabet = "0123456789" * 4 + "-.() \n@abcxyz.com_%+"
+    for _ in range(5000):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 80)))
+        for separator in "-.":
+            assert find_by_separator(text, separator) == reference_find_by_separator(
+                text, separator
+            )
+        assert scrape_emails_noregex(text) == reference_scrape_emails_noregex(text)
+
+
+class SearchCounter(str):
+    """A string that counts the characters its `find()` calls search through."""
+
+    searched = 0
+
+    def find(self, sub, start=0, end=None) -> int:  # type: ignore[override]
+        index = super().find(sub, start, end)
+        self.searched += (len(self) if index == -1 else index + len(sub)) - start
+        return index
+
+
+@pytest.mark.parametrize(
+    "scan, unit, module, helper",
+    [
+        # Separators a match skips over followed by a long run without any
+        (
+            lambda text: find_by_separator(text, "-"),
+            "555-123-4567 1-1-1-",
+            "phone_scraper",
+            "count_consecutive_numbers",
+        ),
+        (scrape_emails_noregex, "a@b.c @@ x@", "email_scraper", "count_valid_characters"),
+    ],
+)
+def test_scanners_are_linear(monkeypatch, scan, unit: str, module: str, helper: str):
+    module = getattr(scrapetools, module)
+    count = getattr(module, helper)
+    counted = 0
+
+    def counting(text: str, start: int, stop: int, *args) -> int:
+        nonlocal counted
+        result = count(text, start, stop, *args)
+        counted += result + 1
+        return result
+
+    monkeypatch.setattr(module, helper, counting)
+    for size in [100, 1000, 10000]:
+        text = SearchCounter(unit * size + "x" * size * len(unit))
+        counted = 0
+        scan(text)
+        # Each character is only looked at a few times, however long the text
+        assert text.searched + counted < 4 * len(text)
+
+
+def test_bytes_match_text():
+    text = SOURCE + " +1201-555-0123 é212-555-0199 Ann%40x.com u003ebob@site.org \n"
+    data = text.encode()
+    buffer = mmap.mmap(-1, len(data))
+    buffer.write(data)
+    emails = scrapetools.scrape_emails(text)
+    numbers = scrapetools.scrape_phone_numbers(text)
+    assert "2015550123" in numbers
+    for source in [data, bytearray(data), memoryview(data), buffer]:
+        assert scrapetools.scrape_emails(source) == emails
+        assert scrapetools.scrape_phone_numbers(source) == numbers
+
+
+def test_skip_code():
+    assert "sales@example.com" in scrapetools.scrape_emails(SOURCE)
+    assert scrapetools.scrape_emails(SOURCE, skip_code=True) == ["john.doe@company.org"]
+    text = SOURCE + '<img src="data:image/png;base64,2125550199AAAA">'
+    numbers = scrapetools.scrape_phone_numbers(text, skip_code=True)
+    assert numbers == scrapetools.scrape_phone_numbers(SOURCE)
+    scraper = scrapetools.LinkScraper(SOURCE, URL, skip_code=True)
+    scraper.scrape_page()
+    assert "https://cdn.example.org/lib.js" not in scraper.script_links
+    assert "https://www.example.com/js/app.js" in scraper.script_links
+
+
+def test_remove_code():
+    rng = random.Random(17)
+    parts = ["<script>", "</script>", "<STYLE a>", "</style >", "</script", "data:x"]
+    parts += ["<scripts>", " ", "a", "'"]
+    code = get_pattern("code")
+    for _ in range(2000):
+        text = "".join(rng.choice(parts) for _ in range(rng.randint(0, 12)))
+        assert remove_code(text) == code.sub("\n", text)
+        assert remove_code(text.encode()) == code.sub("\n", text).encode()
+
+    def unclosed(count: int) -> str:
+        return "<p>a@b.com</p>" + "<script>x" * count
+
+    # Unclosed elements run to the end of the text
+    assert remove_code(unclosed(8000)) == "<p>a@b.com</p>\n"
+    assert remove_code(unclosed(8000).encode()) == b"<p>a@b.com</p>\n"
+
+
+class PatternCounter:
+    """Wraps a pattern to count the characters its `search()` calls search through."""
+
+    def __init__(self, pattern: re.Pattern[str]):
+        self.pattern = pattern
+        self.searched = 0
+
+    def search(self, text: str, pos: int = 0) -> re.Match[str] | None:
+        match = self.pattern.search(text, pos)
+        self.searched += (match.end() if match else len(text)) - pos
+        return match
+
+
+def test_remove_code_is_linear(monkeypatch):
+    counters = [PatternCounter(prefilter.CODE_START)]
+    counters += [PatternCounter(pattern) for pattern in prefilter.CODE_ENDS]
+    monkeypatch.setattr(prefilter, "CODE_START", counters[0])
+    monkeypatch.setattr(prefilter, "CODE_ENDS", tuple(counters[1:]))
+    for size in [100, 1000, 10000]:
+        text = "<script>x</script> data:a " * size + "<style>y" * size
+        assert remove_code(text) == "\n \n " * size + "\n"
+        # Each character is searched at most once, even with unclosed tags
+        assert sum(counter.searched for counter in counters) <= len(text)
+        for counter in counters:
+            counter.searched = 0
+
+
+def test_result_cache(tmp_path):
+    cache = scrapetools.ResultCache()
+    for _ in range(3):
+        assert cache.scrape_emails(SOURCE) == scrapetools.scrape_emails(SOURCE)
+    assert cache.stats()["hits"] == 2
+    # Changing a result doesn't change the cached one
+    cache.scrape_emails(SOURCE).clear()
+    assert cache.scrape_emails(SOURCE) == scrapetools.scrape_emails(SOURCE)
+    links = cache.scrape_links(SOURCE, URL)
+    links["page"].clear()
+    links = cache.scrape_links(SOURCE, URL)
+    assert links["page"]
+    assert cache.scrape_links(SOURCE, URL) == links
+    # The same bytes in another encoding are another document
+    data = "é212-555-0123".encode("latin-1")
+    assert cache.scrape_phone_numbers(data, encoding="latin-1") == []
+    assert cache.scrape_phone_numbers(data) == ["2125550123"]
+    assert cache.scrape_links(SOURCE, "https://other.com/") != links
+
+    blocks = scrapetools.ResultCache(block_size=100)
+    pages = [f"<p>unique {i} {i}@site{i}.com</p>\n" + SOURCE for i in range(5)]
+    for page in pages:
+        assert blocks.scrape_emails(page) == scrapetools.scrape_emails(page)
+        assert blocks.scrape_phone_numbers(page) == scrapetools.scrape_phone_numbers(page)
+    assert blocks.stats()["hits"] > blocks.stats()["misses"]
+
+    path = tmp_path / "results.db"
+    disk = scrapetools.ResultCache(SqliteCache(path, maxsize=2))
+    numbers = disk.scrape_phone_numbers(SOURCE)
+    disk.cache.close()
+    disk = scrapetools.ResultCache(SqliteCache(path, maxsize=2))
+    assert disk.scrape_phone_numbers(SOURCE) == numbers
+    assert disk.stats()["hits"] == 1
+    disk.scrape_emails("a@b.com")
+    disk.scrape_emails("c@d.com")
+    assert len(disk.cache) == 2
+    disk.cache.close()
+
+    # Hits are written in batches, but still decide what's evicted
+    lru = SqliteCache(path, maxsize=2, flush_size=100)
+    lru.set("a", 1)
+    lru.set("b", 2)
+    assert lru.get("a") == 1
+    lru.set("c", 3)
+    assert "a" in lru and "b" not in lru
+    assert lru.get("c") == 3
+    lru.close()
+    lru = SqliteCache(path, maxsize=2)
+    lru.set("d", 4)
+    assert "c" in lru and "a" not in lru
+    lru.close()
+
+
+def test_cli_resumes_from_checkpoint(tmp_path):
+    pages = tmp_path / "pages"
+    (pages / "sub").mkdir(parents=True)
+    for i, name in enumerate(["a.html", "b.html", "sub/c.htm", "skip.txt"]):
+        (pages / name).write_text(SOURCE.replace("john.doe", f"user{i}"))
+    output = tmp_path / "results.jsonl"
+    checkpoint = tmp_path / "done.txt"
+    checkpoint.write_text(str(pages / "a.html") + "\n")
+    args = ["-e", "emails,phones", str(pages), "-w", "1"]
+    scrapetools.cli.main(args + ["-o", str(output), "--checkpoint", str(checkpoint)])
+    results = [json.loads(line) for line in output.read_text().splitlines()]
+    assert sorted(result["path"] for result in results) == [
+        str(pages / "b.html"),
+        str(pages / "sub/c.htm"),
+    ]
+    assert results[0]["emails"] == ["sales@example.com", "user1@company.org"]
+    assert results[0]["seconds"] > 0 and results[0]["page_links"] == []
+    assert len(checkpoint.read_text().splitlines()) == 3
+    scrapetools.cli.main(args + ["-o", str(output), "--checkpoint", str(checkpoint)])
+    assert len(output.read_text().splitlines()) == 2
+
+
+def test_failed_documents_are_reported(tmp_path, capsys):
+    documents = [(SOURCE, URL), (None, URL), (SOURCE, URL)]
+    results = list(scrapetools.scrape_many(documents, workers=1))
+    assert [result["index"] for result in results] == [0, 1, 2]
+    assert results[1] == {"index": 1, "error": results[1]["error"]}
+    assert results[1]["error"].startswith("TypeError: ")
+    assert results[2]["emails"] == scrapetools.scrape_emails(SOURCE)
+    # Bad arguments are raised instead of being returned for every document
+    with pytest.raises(ValueError):
+        list(scrapetools.scrape_many(documents, extractors=["email"]))
+    with pytest.raises(ValueError):
+        list(scrapetools.scrape_many(documents, backend="lxm"))
+    with pytest.raises(ValueError):
+        scrapetools.SiteCrawler(URL, extractors=["email"])
+    with pytest.raises(ValueError):
+        scrapetools.SiteCrawler(URL, backend="stream")
+
+    for name in ["a.html", "b.html"]:
+        (tmp_path / name).write_text(SOURCE)
+    paths = [str(tmp_path / name) for name in ["a.html", "missing.html", "b.html"]]
+    output = tmp_path / "results.jsonl"
+    checkpoint = tmp_path / "done.txt"
+    args = paths + ["-e", "emails", "-w", "1", "-o", str(output)]
+    assert scrapetools.cli.main(args + ["--checkpoint", str(checkpoint)]) == 1
+    results = {
+        result["path"]: result
+        for result in map(json.loads, output.read_text().splitlines())
+    }
+    assert results[paths[1]]["error"].startswith("FileNotFoundError: ")
+    assert results[paths[0]]["emails"] == results[paths[2]]["emails"] != []
+    assert "missing.html" in capsys.readouterr().err
+    assert checkpoint.read_text().splitlines() == [paths[0], paths[2]]
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    process = subprocess.run(
+        [sys.executable, "-m", "scrapetools", paths[1]], capture_output=True, env=env
+    )
+    assert process.returncode == 1
+
+
+def test_phone_regions():
+    text = (
+        "Call (212) 555-0123 or +1 415.555.2671, London 020 7946 0958, "
+        "+44 (0)161 496 0000, Paris 01 42 68 53 00, Tokyo +81 3-1234-5678, "
+        "on 2024-01-02 12-345-67, id 83977"
+    )
+    us_numbers = ["+1" + number for number in scrapetools.scrape_phone_numbers(text)]
+    assert scrapetools.scrape_phone_numbers(text, regions=["US"]) == us_numbers
+    numbers = scrapetools.scrape_phone_numbers(text, regions=["us", "GB", "FR"])
+    assert numbers == sorted(
+        us_numbers + ["+33142685300", "+441614960000", "+442079460958"]
+    )
+    assert scrapetools.scrape_phone_numbers(text.encode(), regions=["FR"]) == [
+        "+33142685300"
+    ]
+    assert list(scrapetools.iter_phone_numbers(text, 16, regions=["GB"])) == [
+        "+442079460958",
+        "+441614960000",
+    ]
+    regions = (region for region in ["GB"])
+    assert len(list(scrapetools.iter_phone_numbers(text, 16, regions=regions))) == 2
+    regions = (region for region in ["FR"])
+    assert scrapetools.scrape_phone_numbers(text, regions=regions) == ["+33142685300"]
+    with pytest.raises(ValueError):
+        scrapetools.scrape_phone_numbers(text, regions=["XX"])
+
+
+def measure_link_scraper(page: str, **kwargs) -> tuple[list[str], int, int]:
+    """Returns the links found and the retained and peak memory of scraping `page`."""
+    release = kwargs.pop("release", False)
+    # Measure cold, and don't count the links memo shared by every scraper
+    normalize_link.cache_clear()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        scraper = scrapetools.LinkScraper(page, URL, **kwargs)
+        scraper.scrape_page(release=release)
+        normalize_link.cache_clear()
+        gc.collect()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return scraper.get_links(), retained, peak
+
+
+def test_link_scraper_memory():
+    page = "".join(SOURCE.replace("/about", f"/about/{i}") for i in range(200))
+    links, retained, peak = measure_link_scraper(page)
+    released_links, released_retained, released_peak = measure_link_scraper(
+        page, release=True
+    )
+    assert released_links == links and len(links) > 200
+    # Only the links are kept, not the source or the tree.
+    # Cold, this includes bounded caches in urllib, about 40 KB.
+    assert released_retained < len(page) < retained // 10
+    streamed_links, _, streamed_peak = measure_link_scraper(
+        page, max_tree_size=len(page) - 1, release=True
+    )
+    assert streamed_links == links
+    assert streamed_peak < released_peak / 2
+
+    scraper = scrapetools.LinkScraper(page, URL)
+    scraper.scrape_page(release=True)
+    assert scraper.soup is None and scraper.source == ""
+    with pytest.raises(RuntimeError):
+        scraper.scrape_page()
+
+
+def test_scrape_many_matches_serial():
+    documents = [(SOURCE * (i % 3 + 1), URL) for i in range(20)]
+    serial = list(scrapetools.scrape_many(documents, workers=1))
+    parallel = list(scrapetools.scrape_many(documents, workers=2, chunksize=3))
+    assert parallel == serial
+    assert [result["index"] for result in serial] == list(range(20))
+    assert serial[0]["emails"] == scrapetools.scrape_emails(SOURCE)
+    unordered = scrapetools.scrape_many(documents, workers=2, ordered=False)
+    assert sorted(result["index"] for result in unordered) == list(range(20))
+
+
+@pytest.mark.parametrize(
+    "email, reason",
+    [
+        ("john.doe@company.org", None),
+        ("john@@company.org", "at_count"),
+        ("john.doe@company", "no_dot_in_domain"),
+        ("jo..hn@company.org", "consecutive_dots"),
+        ("logo@2x.png", "file_extension"),
+        ("12345@company.org", "numeric_local"),
+        ("www.john@company.org", "starts_with_www"),
+    ],
+)
+def test_validate_explain(email: str, reason: str | None):
+    assert scrapetools.email_scraper.validate(email, explain=True) == (
+        reason is None,
+        reason,
+    )
+    assert scrapetools.email_scraper.validate(email) == (reason is None)
+
+
+def test_phone_validation_cache(tmp_path):
+    cache = scrapetools.phone_scraper.validation_cache
+    cache.clear()
+    numbers = scrapetools.scrape_phone_numbers(SOURCE)
+    misses = cache.stats()["misses"]
+    assert scrapetools.scrape_phone_numbers(SOURCE) == numbers
+    assert cache.stats()["misses"] == misses
+    assert cache.stats()["hits"] > 0
+    # Area codes with 9 as the middle digit are rejected before the cache
+    assert not scrapetools.phone_scraper.is_valid_number("2925550123")
+    path = tmp_path / "cache.json"
+    cache.save(path)
+    cache.clear()
+    cache.load(path)
+    assert len(cache) == misses
+
+
+def test_lazy_imports():
+    script = (
+        "import sys, scrapetools; scrapetools.scrape_emails;"
+        "print('bs4' in sys.modules, 'phonenumbers' in sys.modules)"
+    )
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    output = subprocess.run(
+        [sys.executable, "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+        env=env,
+    ).stdout
+    assert output.split() == ["False", "False"]
+    assert set(scrapetools.__all__) <= set(dir(scrapetools))
+    with pytest.raises(AttributeError):
+        scrapetools.not_an_attribute
+
+
+def test_site_crawler():
+    pages = {
+        "https://www.example.com": '<a href="/a">a</a><a href="/b">b</a>',
+        "https://www.example.com/a": '<a href="/b">b</a> ab@example.com',
+        "https://www.example.com/b": '<a href="/c">c</a><a href="https://other.com">',
+        "https://www.example.com/c": '<a href="/">home</a> (212) 555-0123',
+    }
+    crawler = scrapetools.SiteCrawler(
+        "https://www.example.com/", fetch=make_dict_fetcher(pages), concurrency=2
+    )
+    results = crawler.run()
+    assert sorted(result["url"] for result in results) == sorted(pages)
+    assert crawler.visited == set(pages)
+    assert [email for result in results for email in result["emails"]] == [
+        "ab@example.com"
+    ]
+    limited = scrapetools.SiteCrawler(
+        "https://www.example.com", fetch=make_dict_fetcher(pages), max_pages=2
+    )
+    assert len(limited.run()) == 2
+
+
+def test_site_crawler_records_failed_pages(monkeypatch):
+    pages = {
+        "https://www.example.com": '<a href="/a">a</a><a href="/b">b</a>',
+        "https://www.example.com/a": '<a href="/c">c</a>',
+        "https://www.example.com/b": "ab@example.com",
+    }
+
+    def scrape_page(source: str, url: str, *args):
+        if url.endswith("/a"):
+            raise RuntimeError("bad page")
+        return scrapetools.scrape_page(source, url, *args)
+
+    monkeypatch.setattr(batch, "scrape_page", scrape_page)
+    crawler = scrapetools.SiteCrawler(
+        "https://www.example.com", fetch=make_dict_fetcher(pages)
+    )
+    results = crawler.run()
+    assert crawler.errors == {"https://www.example.com/a": "RuntimeError: bad page"}
+    assert sorted(result["url"] for result in results) == [
+        "https://www.example.com",
+        "https://www.example.com/b",
+    ]
+    # Links on the failed page aren't followed
+    assert "https://www.example.com/c" not in crawler.visited
+
+
+def test_link_normalization():
+    source = (
+        '<a href="about">a</a><a href="../up">b</a><a href="//cdn.com/x/">c</a>'
+        '<a href="/y">d</a><a href="https://ww.example.com">e</a>'
+        '<a href="page.html?next=http://a.com/x">f</a><a href="https:same">g</a>'
+    )
+    scraper = scrapetools.LinkScraper(source, "https://www.example.com/dir/page")
+    scraper.scrape_page()
+    assert scraper.page_links == [
+        "https://cdn.com/x",
+        "https://ww.example.com",
+        "https://www.example.com/dir/about",
+        "https://www.example.com/dir/page.html?next=http://a.com/x",
+        "https://www.example.com/dir/same",
+        "https://www.example.com/up",
+        "https://www.example.com/y",
+    ]
+    assert scraper.get_links(same_site_only=True) == scraper.page_links[2:]
+
+
+def test_link_store():
+    store = scrapetools.LinkStore()
+    scraper = scrapetools.LinkScraper(SOURCE, URL)
+    scraper.scrape_page()
+    assert store.add_scraper(scraper) == len(scraper.get_links())
+    assert store.add_scraper(scraper) == 0
+    for link_type in ["all", "page", "img", "script"]:
+        assert store.get_links(link_type) == scraper.get_links(link_type)
+    assert store.get_links(host="example.com") == scraper.get_links(same_site_only=True)
+    assert store.get_type("https://www.example.com/img/logo.png") == (
+        scrapetools.link_store.IMG
+    )
+    assert "https://www.example.com/about" in store
+
+
+def test_instrumentation():
+    from scrapetools import instrumentation
+
+    assert instrumentation.stage("emails", "regex") is instrumentation.null_stage
+    with instrumentation.record() as recorder:
+        emails = scrapetools.scrape_emails(SOURCE)
+        scrapetools.scrape_phone_numbers(SOURCE)
+        scrapetools.LinkScraper(SOURCE, URL).scrape_page()
+    stats = recorder.to_dict()
+    assert stats["emails"]["validate"]["accepted"] == len(emails)
+    assert stats["emails"]["prefilter"]["bytes"] == len(SOURCE)
+    assert {"parse", "collect", "unescape", "regex", "normalize"} <= set(stats["links"])
+    assert stats["phones"]["validate"]["calls"] == 1
+    assert 'scraper="emails",stage="regex"' in recorder.to_prometheus()
+    # Nothing is recorded after the context exits
+    scrapetools.scrape_emails(SOURCE)
+    assert recorder.to_dict() == stats